@@ -15,50 +15,31 @@ from pystray import MenuItem as item
 from PIL import Image, ImageDraw, ImageTk
 import json
 import os
-import pickle
-import subprocess
-import sys
-import atexit
+import queue
 from dataclasses import dataclass
 
 from modules.app_utils import *
+from modules.atomic_file import atomic_write
+from modules.sequence_file import SequenceView, write_sequence, open_sequence, is_binary_sequence
+from modules.event_buffer import EventBuffer
+from modules.simplify import MoveFilter, simplify_events
+from modules.scheduler import PlaybackScheduler
+from modules.hotkeys import HotkeyEngine, SPECIAL_KEYS, parse_binding, format_binding
+from modules.file_watch import FileWatcher
+from modules.sequence_library import SequenceLibrary
+from modules.sequence_loader import SequenceCache, SequenceLoad
+from modules.playback_options import (
+    validate_options, loop_interval, load_sequence_options, save_sequence_options, rename_sequence_options,
+)
 
-# Global process variable for key_listener.py
-key_listener_process = None
 settings_active = False  # Flag to track if settings page is in focus
 
-def start_key_listener():
-    """Start key_listener.py in the background using the same Python interpreter."""
-    global key_listener_process
-    if not os.path.exists("client/modules/key_listener.py"):
-        print("Error: key_listener.py not found in current directory")
-        return
-    python_executable = sys.executable
-    key_listener_process = subprocess.Popen([python_executable, "client/modules/key_listener.py"])
-    print(f"Started key_listener.py in background with PID: {key_listener_process.pid}")
-
-def stop_key_listener():
-    """Stop the key_listener.py process."""
-    global key_listener_process
-    if key_listener_process and key_listener_process.poll() is None:
-        print("Stopping key_listener.py...")
-        key_listener_process.terminate()
-        try:
-            key_listener_process.wait(timeout=2)
-            print("key_listener.py stopped gracefully")
-        except subprocess.TimeoutExpired:
-            key_listener_process.kill()
-            print("key_listener.py forcefully stopped")
-    key_listener_process = None
-
-atexit.register(stop_key_listener)
-
 # Initialize controllers
 mouse_ctrl = MouseController()
 keyboard_ctrl = KeyboardController()
 
-# Store recorded events
-events = []
+# Store recorded events: an EventBuffer while recording, a SequenceView (memory-mapped) once loaded
+events = EventBuffer()
 recording = False
 looping = False
 playing = False
@@ -66,18 +47,27 @@ playing = False
 # Current sequence name (for saving)
 current_sequence_name = "Untitled"
 default_save_dir = "client/saved_sequences"
+current_sequence_dir = default_save_dir
+
+# Stats for every saved sequence, cached in library.json
+library = SequenceLibrary(default_save_dir)
+library_scanned = False
+# Rows of widgets in the sequence list; they are reused as the list scrolls
+VISIBLE_SEQUENCE_ROWS = 4
 
 # Time to wait between loops (in seconds)
 LOOP_INTERVAL = 5
 
-# Special keys mapping
-SPECIAL_KEYS = {k.name: k for k in [
-    Key.f1, Key.f2, Key.f3, Key.f4, Key.f5, Key.f6,
-    Key.f7, Key.f8, Key.f9, Key.f10, Key.f11, Key.f12,
-    Key.ctrl_l, Key.alt_l, Key.shift_l, Key.enter, Key.space
-]}
+# Playback options, set under "playback" in keybinds.json or per sequence in playback.json:
+# speed multiplier, cap in seconds on any gap between events (0 = off),
+# and the loop interval picked at random between loop_min and loop_max
+DEFAULT_PLAYBACK = {"speed": 1.0, "max_gap": 0, "loop_min": LOOP_INTERVAL, "loop_max": LOOP_INTERVAL}
+playback_settings = DEFAULT_PLAYBACK.copy()
+sequence_options = {}  # overrides for the loaded sequence
+# Drives the current playback loop; stop() wakes it immediately
+scheduler = PlaybackScheduler()
 
-# Default keybinds (matching key_listener.py)
+# Default keybinds
 DEFAULT_KEYBINDS = {
     "start_record": ["shift_l", "r"],
     "stop": ["shift_l", "q"],
@@ -91,34 +81,59 @@ KEYBINDS_FILE = "client/keybinds.json"
 keybinds = DEFAULT_KEYBINDS.copy()
 pending_keybinds = keybinds.copy()
 
+# Mouse-move thinning, set under "recording" in keybinds.json (0 = off):
+# moves closer than move_interval_ms / move_distance_px are dropped while recording,
+# and simplify_epsilon_px applies path simplification when a sequence is saved
+DEFAULT_RECORDING = {"move_interval_ms": 0, "move_distance_px": 0, "simplify_epsilon_px": 0}
+recording_settings = DEFAULT_RECORDING.copy()
+# Tolerance for the simplify button when simplify_epsilon_px is off
+SIMPLIFY_EPSILON_PX = 2
+move_filter = MoveFilter()
+
 # Default app name
 DEFAULT_APP_NAME = "Anti-Idle"
 
 # ========================== Functions for mouse/keyboard events recording ==============================
 
+def flush_move():
+    """Record the last move the filter held back, so the cursor ends where it really was."""
+    pending = move_filter.take_pending()
+    if pending:
+        events.add_move(*pending)
+
 def on_move(x, y):
     if recording:
-        events.append(('move', (x, y), time.time()))
+        now = time.time()
+        if move_filter.accept(x, y, now):
+            events.add_move(x, y, now)
 
 def on_click(x, y, button, pressed):
     if recording and pressed:
-        events.append(('click', (x, y, button), time.time()))
+        flush_move()
+        events.add_click(x, y, button, time.time())
 
 def on_press(key):
+    hotkeys.on_press(key)
     if recording:
-        events.append(('key_press', key, time.time()))
+        flush_move()
+        events.add_key('key_press', key, time.time())
 
 def on_release(key):
+    hotkeys.on_release(key)
     if recording:
-        events.append(('key_release', key, time.time()))
+        flush_move()
+        events.add_key('key_release', key, time.time())
 
 # ============================== Record and playback functions ===================================
 def start_recording(event=None):
-    global recording, current_sequence_name
+    global recording, current_sequence_name, move_filter, sequence_options
     if not recording:
+        cancel_loading()  # a load finishing later must not replace the new recording
         current_sequence_name = "Untitled"
+        sequence_options = {}
+        move_filter = MoveFilter(recording_settings["move_interval_ms"] / 1000, recording_settings["move_distance_px"])
+        set_events(EventBuffer())  # rebind rather than clear: a loaded sequence is a read-only view
         recording = True
-        events.clear()
         status_var.set("Recording started...")
         print("start_recording executed")
 
@@ -126,6 +141,8 @@ def stop(event=None):
     global looping, recording
     # Call end_task
     looping = False
+    scheduler.stop()
+    cancel_loading()
     status_var.set("Event stopped.")
     for key in [Key.shift_l, Key.shift_r, Key.ctrl_l, Key.ctrl_r, Key.alt_l, Key.alt_r]:
         keyboard_ctrl.release(key)
@@ -134,6 +151,7 @@ def stop(event=None):
     # Call stop_recording
     if recording:
         recording = False
+        flush_move()
         if events:
             status_var.set(f"Recording stopped ({len(events)} events)")
             root.after(0, ask_to_save)
@@ -141,71 +159,163 @@ def stop(event=None):
             status_var.set("Recording stopped (no events)")
         print("stop_recording executed")
 
-def playback():
+def play_event(action, data):
+    if action == 'move':
+        mouse_ctrl.position = data
+    elif action == 'click':
+        x, y, button = data
+        mouse_ctrl.position = (x, y)
+        mouse_ctrl.click(button)
+    elif action == 'key_press':
+        keyboard_ctrl.press(data)
+    elif action == 'key_release':
+        keyboard_ctrl.release(data)
+
+def current_playback_options():
+    return {**playback_settings, **sequence_options}
+
+def playback(scheduler, start_ns=None):
+    """Play the current sequence once; returns the last event's deadline, or None if stopped."""
     global playing
     if not events:
         status_var.set("No events recorded!")
-        return
+        return None
+    sequence = events  # keep this pass on the same sequence even if another one is loaded
     playing = True
     status_var.set("Playing...")
     print("playback started")
-    start_time = events[0][2]
-    for event in events:
-        if not looping:
-            print("playback stopped by looping flag")
-            break
-        action, data, event_time = event
-        sleep_time = max(0, event_time - start_time)
-        elapsed = 0
-        while elapsed < sleep_time and looping:
-            time.sleep(min(0.1, sleep_time - elapsed))
-            elapsed += 0.1
-        if not looping:
-            print("playback interrupted mid-sleep")
-            break
-        if action == 'move':
-            mouse_ctrl.position = data
-        elif action == 'click':
-            x, y, button = data
-            mouse_ctrl.position = (x, y)
-            mouse_ctrl.click(button)
-        elif action == 'key_press':
-            keyboard_ctrl.press(data)
-        elif action == 'key_release':
-            keyboard_ctrl.release(data)
-        start_time = event_time
-    for key in [Key.shift_l, Key.shift_r, Key.ctrl_l, Key.ctrl_r, Key.alt_l, Key.alt_r]:
-        keyboard_ctrl.release(key)
-    playing = False
-    print("playback finished")
-
-def loop_playback():
+    options = current_playback_options()
+    try:
+        end_ns = scheduler.run(sequence, play_event, start_ns, speed=options["speed"], max_gap=options["max_gap"])
+    finally:
+        for key in [Key.shift_l, Key.shift_r, Key.ctrl_l, Key.ctrl_r, Key.alt_l, Key.alt_r]:
+            keyboard_ctrl.release(key)
+        playing = False
+    stats = scheduler.last_stats
+    if stats["events"]:
+        print(f"playback {'finished' if end_ns else 'stopped'}: {stats['events']} events, "
+              f"late by mean {stats['mean_us']}us, p99 {stats['p99_us']}us, max {stats['max_us']}us")
+    return end_ns
+
+def loop_playback(scheduler):
     global looping, playing
     looping = True
     print("loop_playback started")
-    while looping:
-        playback()
-        if looping:
-            status_var.set(f"Wait {LOOP_INTERVAL}s...")
-            elapsed = 0
-            while elapsed < LOOP_INTERVAL and looping:
-                time.sleep(min(0.1, LOOP_INTERVAL - elapsed))
-                elapsed += 0.1
-            print(f"Loop interval completed: {LOOP_INTERVAL}s")
-    status_var.set("Event stopped.")
-    playing = False
-    print("loop_playback stopped")
+    next_start = None
+    try:
+        while looping:
+            end_ns = playback(scheduler, next_start)
+            if end_ns is None:
+                break
+            interval = loop_interval(current_playback_options())
+            status_var.set(f"Wait {interval:.1f}s...")
+            # anchor the next pass on this one's schedule, not on when we got here
+            next_start = end_ns + round(interval * 1e9)
+            if not scheduler.wait_until(next_start):
+                break
+            print(f"Loop interval completed: {interval:.1f}s")
+        status_var.set("Event stopped.")
+    except Exception as e:
+        # play_task only starts a new loop once this one is no longer looping
+        looping = False
+        print(f"❌ Playback failed: {e}")
+        status_var.set(f"Playback failed: {e}")
+    finally:
+        playing = False
+        print("loop_playback stopped")
 
 def play_task(event=None):
+    global scheduler
     if not looping and events:
         status_var.set("Starting loop...")
         print("play_task executed")
-        threading.Thread(target=loop_playback, daemon=True).start()
-
+        scheduler = PlaybackScheduler()  # a fresh stop event, so a finishing old loop cannot be revived
+        threading.Thread(target=loop_playback, args=(scheduler,), daemon=True).start()
 
 # ========================== File operations for sequences =======================================================
+def set_events(new_events):
+    """Replace the current sequence in one step.
+
+    An old mapped view is unmapped once nothing holds it any more (playback,
+    the sequence cache), so it is not closed here.
+    """
+    global events
+    events = new_events
+
+def release_sequence_file(file_path):
+    """Drop file_path from the cache and copy the current sequence into memory if it is mapped from it.
+
+    Windows refuses to rename, replace or delete a mapped file. Returns True
+    if the sequence was released, so the caller can map it again afterwards.
+    """
+    sequence_cache.discard(file_path)
+    old = events
+    if isinstance(old, SequenceView) and os.path.abspath(old.path) == os.path.abspath(file_path):
+        set_events(EventBuffer(old))
+        if not playing:
+            old.close()
+        return True
+    return False
+
+# Recently loaded sequences, so switching back to one is instant
+sequence_cache = SequenceCache()
+current_load = None
+prefetch_load = None
+
+def load_sequence_async(file_path):
+    """Load file_path on a worker thread; it replaces events on the UI thread once complete."""
+    global current_load
+    cancel_loading()
+    status_var.set(f"Loading {os.path.basename(file_path)}...")
+    load = SequenceLoad(file_path, sequence_cache, on_done=lambda load: post_to_ui(finish_loading, load))
+    load.on_progress = lambda fraction: post_to_ui(show_load_progress, load, fraction)
+    current_load = load.start()
+
+def show_load_progress(load, fraction):
+    if load is current_load and not load.cancelled:
+        status_var.set(f"Loading {os.path.basename(load.path)}: {fraction:.0%}")
+
+def finish_loading(load):
+    global current_load, current_sequence_name, current_sequence_dir, sequence_options
+    if load is not current_load:
+        return  # superseded by a newer load
+    current_load = None
+    if load.cancelled:
+        status_var.set("Loading cancelled")
+        return
+    if load.error is not None:
+        status_var.set("Ready")
+        messagebox.showerror("Error", f"Failed to load sequence: {load.error}")
+        return
+    set_events(load.result)
+    current_sequence_name = os.path.basename(load.path)
+    current_sequence_dir = os.path.dirname(load.path)
+    sequence_options = load_sequence_options(current_sequence_dir, current_sequence_name)
+    status_var.set(f"Loaded: {current_sequence_name} ({len(events)} events)")
+
+def cancel_loading():
+    if current_load is not None:
+        current_load.cancel()
+
+def prefetch_sequence(filename):
+    """Warm the cache for a sequence the pointer is on, so clicking it loads instantly."""
+    global prefetch_load
+    if not filename:
+        return
+    file_path = os.path.join(default_save_dir, filename)
+    if sequence_cache.get(file_path) is not None:
+        return
+    try:
+        if not is_binary_sequence(file_path):
+            return  # legacy files are only migrated when actually opened
+    except OSError:
+        return
+    if prefetch_load is not None:
+        prefetch_load.cancel()
+    prefetch_load = SequenceLoad(file_path, sequence_cache, on_done=lambda load: None).start()
+
 def save_sequence():
-    global events, current_sequence_name
+    global events, current_sequence_name, current_sequence_dir
     # Check if there are events to save
     if not events:
         messagebox.showwarning("Warning", "No events to save")
@@ -234,29 +344,30 @@ def save_sequence():
                 current_sequence_name += '.seq'
                 file_path = os.path.join(os.path.dirname(file_path), current_sequence_name)
             
-            # Save events using pickle
-            with open(file_path, 'wb') as f:
-                pickle.dump(events, f)
+            remap = release_sequence_file(file_path)
+            if recording_settings["simplify_epsilon_px"] > 0:
+                write_sequence(file_path, simplify_events(events, epsilon=recording_settings["simplify_epsilon_px"]))
+            else:
+                write_sequence(file_path, events)
+            if remap:
+                set_events(open_sequence(file_path))
+            current_sequence_dir = os.path.dirname(file_path)
+            save_sequence_options(current_sequence_dir, current_sequence_name, sequence_options)
             
             # Refresh sequence list
-            refresh_sequence_list()
+            if os.path.abspath(current_sequence_dir) == os.path.abspath(default_save_dir):
+                library.update(current_sequence_name)
+                render_sequence_rows()
             print(f"Sequence saved to {file_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save sequence: {e}")
 
 def load_sequence(event=None):
-    global events, current_sequence_name
     if not os.path.exists(default_save_dir):
         os.makedirs(default_save_dir)
     file_path = filedialog.askopenfilename(initialdir=default_save_dir, title="Load Sequence", filetypes=(("Sequence files", "*.seq"), ("All files", "*.*")))
     if file_path:
-        try:
-            with open(file_path, 'rb') as f:
-                events = pickle.load(f)
-            current_sequence_name = os.path.basename(file_path)
-            status_var.set(f"Loaded: {current_sequence_name} ({len(events)} events)")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load sequence: {e}")
+        load_sequence_async(file_path)
 
 def ask_to_save():
     if messagebox.askyesno("Save Sequence", "Do you want to save this sequence?"):
@@ -267,12 +378,16 @@ def delete_sequence(filename):
     if os.path.exists(file_path):
         if messagebox.askyesno("Confirm Delete", f"Delete sequence: {filename}?"):
             try:
+                release_sequence_file(file_path)
                 os.remove(file_path)
-                refresh_sequence_list()
+                save_sequence_options(default_save_dir, filename, None)
+                library.remove(filename)
+                render_sequence_rows()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to delete file: {e}")
 
 def rename_sequence(old_name):
+    global current_sequence_name
     old_path = os.path.join(default_save_dir, old_name)
     if os.path.exists(old_path):
         new_name = simpledialog.askstring("Rename Sequence", "Enter new name:", initialvalue=os.path.splitext(old_name)[0])
@@ -281,24 +396,68 @@ def rename_sequence(old_name):
                 new_name += '.seq'
             new_path = os.path.join(default_save_dir, new_name)
             try:
+                remap = release_sequence_file(old_path)
                 os.rename(old_path, new_path)
-                refresh_sequence_list()
+                rename_sequence_options(default_save_dir, old_name, new_name)
+                if remap:
+                    set_events(open_sequence(new_path))
+                    current_sequence_name = new_name
+                library.rename(old_name, new_name)
+                render_sequence_rows()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to rename file: {e}")
 
-def create_sequence_item(parent, filename):
+def simplify_sequence(filename):
+    file_path = os.path.join(default_save_dir, filename)
+    if not os.path.exists(file_path):
+        return
+    try:
+        remap = release_sequence_file(file_path)
+        sequence = open_sequence(file_path)
+        simplified = simplify_events(
+            sequence,
+            epsilon=recording_settings["simplify_epsilon_px"] or SIMPLIFY_EPSILON_PX,
+            min_interval=recording_settings["move_interval_ms"] / 1000,
+            min_distance=recording_settings["move_distance_px"],
+        )
+        before = len(sequence)
+        if isinstance(sequence, SequenceView):
+            sequence.close()
+        write_sequence(file_path, simplified)
+        if remap:
+            set_events(open_sequence(file_path))
+        library.update(filename)
+        render_sequence_rows()
+        status_var.set(f"Simplified {filename}: {before} -> {len(simplified)} events")
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to simplify sequence: {e}")
+
+def create_sequence_row(parent):
+    """One reusable row; its buttons act on whichever sequence the row currently shows."""
     frame = ttk.Frame(parent)
-    frame.pack(fill=X, pady=2)
-    name_btn = ttk.Button(frame, text=filename, bootstyle=DEFAULT, command=lambda: load_specific_sequence(filename))
+    name_btn = ttk.Button(frame, bootstyle=DEFAULT, command=lambda: load_specific_sequence(frame.filename))
     name_btn.pack(side=LEFT, fill=X, expand=True, padx=(0, 5))
     main_btn_frame = ttk.Frame(frame)
     main_btn_frame.pack(side=RIGHT)
-    ttk.Button(main_btn_frame, text="🔄", width=2, bootstyle=INFO, command=lambda: rename_sequence(filename)).pack(side=LEFT, padx=1)
-    ttk.Button(main_btn_frame, text="❌", width=2, bootstyle=DANGER, command=lambda: delete_sequence(filename)).pack(side=LEFT, padx=1)
+    ttk.Button(main_btn_frame, text="✂", width=2, bootstyle=SECONDARY, command=lambda: simplify_sequence(frame.filename)).pack(side=LEFT, padx=1)
+    ttk.Button(main_btn_frame, text="🔄", width=2, bootstyle=INFO, command=lambda: rename_sequence(frame.filename)).pack(side=LEFT, padx=1)
+    ttk.Button(main_btn_frame, text="❌", width=2, bootstyle=DANGER, command=lambda: delete_sequence(frame.filename)).pack(side=LEFT, padx=1)
+    name_btn.bind("<Enter>", lambda e: prefetch_sequence(frame.filename))
+    frame.name_btn = name_btn
+    frame.filename = None
+    for widget in (frame, name_btn):
+        widget.bind("<MouseWheel>", lambda e: scroll_sequences("scroll", -1 if e.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda e: scroll_sequences("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda e: scroll_sequences("scroll", 1, "units"))
     return frame
 
+def sequence_label(filename):
+    entry = library.get(filename)
+    if not entry or entry["events"] is None:
+        return filename
+    return f"{filename}  ({entry['events']} ev, {entry['duration']:.0f}s)"
+
 def load_specific_sequence(filename):
-    global events, current_sequence_name
     # Ensure filename is a string (in case an Event object is passed)
     if not isinstance(filename, str):
         messagebox.showerror("Error", "Invalid filename provided")
@@ -306,33 +465,54 @@ def load_specific_sequence(filename):
     
     file_path = os.path.join(default_save_dir, filename)
     if os.path.exists(file_path):
-        try:
-            with open(file_path, 'rb') as f:
-                events = pickle.load(f)
-            current_sequence_name = filename
-            status_var.set(f"Loaded: {filename} ({len(events)} events)")
-            show_main()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load sequence: {e}")
+        load_sequence_async(file_path)
+        show_main()
 
 def refresh_sequence_list():
-    for widget in sequence_frame.winfo_children():
-        if widget != sequence_title_frame:
-            widget.destroy()
-    if not os.path.exists(default_save_dir):
-        os.makedirs(default_save_dir)
-    seq_files = [f for f in os.listdir(default_save_dir) if f.endswith('.seq')]
-    if seq_files:
-        for filename in sorted(seq_files):
-            create_sequence_item(sequence_frame, filename)
+    """Rescan the sequences directory (cheap: unchanged files come from library.json)."""
+    global library_scanned
+    library.scan()
+    library_scanned = True
+    render_sequence_rows()
+
+def render_sequence_rows():
+    """Point the fixed set of rows at the sequences currently scrolled into view."""
+    global sequence_offset
+    if sequence_rows is None:
+        return
+    names = library.names()
+    sequence_offset = max(0, min(sequence_offset, len(names) - len(sequence_rows)))
+    for i, row in enumerate(sequence_rows):
+        index = sequence_offset + i
+        if index < len(names):
+            row.filename = names[index]
+            row.name_btn.config(text=sequence_label(row.filename))
+            row.pack(fill=X, pady=2)
+        else:
+            row.filename = None
+            row.pack_forget()
+    if names:
+        empty_sequence_label.pack_forget()
+        sequence_scrollbar.set(sequence_offset / len(names), (sequence_offset + len(sequence_rows)) / len(names))
     else:
-        ttk.Label(sequence_frame, text="No saved sequences found", bootstyle="secondary").pack(pady=20)
+        empty_sequence_label.pack(pady=20)
+        sequence_scrollbar.set(0, 1)
+
+def scroll_sequences(action, amount, unit=None):
+    """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")."""
+    global sequence_offset
+    if action == "moveto":
+        sequence_offset = int(float(amount) * len(library.names()))
+    elif action == "scroll":
+        step = len(sequence_rows) if unit == "pages" else 1
+        sequence_offset += int(amount) * step
+    render_sequence_rows()
 
 # =================================== Keybind management ====================================================
 def save_keybinds_to_file():
-    app_data = {"app_name": app_name_var.get(), "keybinds": keybinds}
-    with open(KEYBINDS_FILE, 'w') as f:
-        json.dump(app_data, f, indent=2)
+    app_data = {"app_name": app_name_var.get(), "keybinds": keybinds, "recording": recording_settings,
+                "playback": playback_settings}
+    atomic_write(KEYBINDS_FILE, json.dumps(app_data, indent=2))  # the file watcher never sees a half-written file
     print(f"Keybinds saved to {KEYBINDS_FILE}")
 
 def load_keybinds_from_file():
@@ -346,11 +526,25 @@ def load_keybinds_from_file():
             app_data = json.load(f)
         if "app_name" in app_data:
             app_name_var.set(app_data["app_name"])
+        for name, value in app_data.get("recording", {}).items():
+            if name in DEFAULT_RECORDING and isinstance(value, (int, float)) and value >= 0:
+                recording_settings[name] = value
+        try:
+            playback = validate_options({k: v for k, v in app_data.get("playback", {}).items() if k in DEFAULT_PLAYBACK})
+            playback_settings.update(playback)
+        except ValueError as e:
+            print(f"Error loading playback settings: {e}")
         keybinds_data = app_data.get("keybinds", {})
         new_keybinds = {}
-        for action, [modifier_str, key_str] in keybinds_data.items():
-            if action in DEFAULT_KEYBINDS:
-                new_keybinds[action] = [modifier_str, key_str]
+        for action, binding in keybinds_data.items():
+            if action not in DEFAULT_KEYBINDS:
+                continue
+            try:
+                parse_binding(binding)
+            except ValueError as e:
+                print(f"Invalid keybind for {action}: {e}")
+                continue
+            new_keybinds[action] = binding
         if new_keybinds:
             keybinds = new_keybinds
             pending_keybinds = keybinds.copy()
@@ -368,6 +562,30 @@ def load_keybinds_from_file():
         print(f"Error loading keybinds: {e}")
         return False
 
+def reload_keybinds():
+    """Apply keybinds.json after it changed on disk; a file that does not validate is ignored whole."""
+    global keybinds, pending_keybinds
+    try:
+        with open(KEYBINDS_FILE, 'r') as f:
+            app_data = json.load(f)
+        new_keybinds = {action: binding for action, binding in app_data.get("keybinds", {}).items()
+                        if action in DEFAULT_KEYBINDS}
+        for binding in new_keybinds.values():
+            parse_binding(binding)
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ignoring keybinds file change: {e}")
+        return
+    if not new_keybinds or new_keybinds == keybinds:
+        return  # our own save, or nothing we use changed
+    keybinds = new_keybinds
+    pending_keybinds = keybinds.copy()
+    hotkeys.load(keybinds)
+    update_keybind_labels()
+    print("Keybinds reloaded from file")
+
+# Reloads keybinds when keybinds.json is edited outside the settings page
+keybinds_watcher = FileWatcher(KEYBINDS_FILE, lambda: post_to_ui(reload_keybinds))
+
 def reset_to_defaults():
     global keybinds, pending_keybinds
     app_name_var.set(DEFAULT_APP_NAME)
@@ -378,9 +596,15 @@ def reset_to_defaults():
     update_keybind_labels()
 
 def update_keybind(action, modifier_name, key_name):
-    if modifier_name in SPECIAL_KEYS and action in pending_keybinds:
-        pending_keybinds[action] = [modifier_name, key_name]
-        print(f"Pending update for {action}: {modifier_name}+{key_name}")
+    if action not in pending_keybinds:
+        return
+    try:
+        parse_binding([modifier_name, key_name])
+    except ValueError as e:
+        print(f"Ignoring keybind for {action}: {e}")
+        return
+    pending_keybinds[action] = [modifier_name, key_name]
+    print(f"Pending update for {action}: {modifier_name}+{key_name}")
 
 def record_keybind(label, action):
     label.config(text="Press combo...")
@@ -421,7 +645,8 @@ def apply_keybinds():
     root.title(app_name_var.get())
     update_keybind_labels()
     save_keybinds_to_file()
-    print("Keybinds updated:", {action: f"{mod}+{key}" for action, [mod, key] in keybinds.items()})
+    hotkeys.load(keybinds)
+    print("Keybinds updated:", {action: format_binding(binding) for action, binding in keybinds.items()})
 
 def update_keybind_labels():
     action_map = {
@@ -442,8 +667,7 @@ def update_keybind_labels():
                     if full_action is None:
                         print(f"Warning: No mapping for short_action '{short_action}'")
                         continue
-                    modifier, key = pending_keybinds[full_action]
-                    keybind_label.config(text=f"{modifier}+{key}")
+                    keybind_label.config(text=format_binding(pending_keybinds[full_action]))
 
 # =============================== Window management =====================================
 window_w = 300
@@ -528,6 +752,8 @@ def show_app( window_w, window_h):
 def close_app():
     global looping, icon, mouse_listener, keyboard_listener
     looping = False
+    scheduler.stop()
+    keybinds_watcher.stop()
     # Stop listeners
     if mouse_listener:
         mouse_listener.stop()
@@ -541,35 +767,73 @@ def close_app():
             print("Tray icon stopped on close")
         except Exception as e:
             print(f"Error stopping tray icon on close: {e}")
-    # Stop key listener process
-    stop_key_listener()
-    # Clean up trigger file
-    if os.path.exists("client/pause_listener.trigger"):
-        os.remove("client/pause_listener.trigger")
     # Release modifier keys
     for key in [Key.shift_l, Key.shift_r, Key.ctrl_l, Key.ctrl_r, Key.alt_l, Key.alt_r]:
         keyboard_ctrl.release(key)
     root.destroy()
     print("App fully closed")
 
-def check_for_triggers():
-    global settings_active
+# Function run by each keybind action
+HOTKEY_COMMANDS = {
+    "start_record": "start_recording",
+    "stop": "stop",
+    "play_task": "play_task",
+}
+
+def run_hotkey(action):
+    """Run the command bound to a hotkey action (called on the UI thread)."""
     if settings_active:
-        # print("Triggers paused (settings active)")
-        root.after(100, check_for_triggers)
         return
-    # print("Checking triggers...")
-    for command in ["start_recording", "stop", "play_task"]:
-        trigger_file = f"{command}.trigger"
-        if os.path.exists(trigger_file):
-            print(f"Trigger file found: {trigger_file}")
-            try:
-                globals()[command]()
-                os.remove(trigger_file)
-                print(f"Trigger {command} executed and file removed")
-            except Exception as e:
-                print(f"Error executing triggered command {command}: {e}")
-    root.after(100, check_for_triggers)
+    command = HOTKEY_COMMANDS.get(action)
+    if command is None:
+        print(f"No command for hotkey action: {action}")
+        return
+    try:
+        globals()[command]()
+        print(f"Hotkey command {command} executed")
+    except Exception as e:
+        print(f"Error executing hotkey command {command}: {e}")
+
+# Matches keybinds on the keyboard listener thread and hands matches to the UI thread
+hotkeys = HotkeyEngine(on_action=lambda action: post_to_ui(run_hotkey, action))
+
+def pause_hotkeys(paused):
+    hotkeys.set_paused(paused)
+
+# ============================== Cross-thread UI calls ==============================
+ui_calls = queue.Queue()
+
+def post_to_ui(func, *args):
+    """Run func(*args) on the Tk main thread; safe to call from any thread."""
+    ui_calls.put((func, args))
+    try:
+        root.event_generate("<<UiCall>>", when="tail")
+    except Exception as e:  # window already destroyed
+        print(f"Dropped UI call {func.__name__}: {e}")
+
+def run_ui_calls(event=None):
+    while True:
+        try:
+            func, args = ui_calls.get_nowait()
+        except queue.Empty:
+            return
+        func(*args)
+
+def on_license_status(stat):
+    if stat is None:
+        messagebox.showwarning("Error.", "Please relaunch the app.")
+        close_app()
+        return
+    elif stat == 'licensed':
+        print('LICENSED')
+    elif stat <= 14:
+        messagebox.showinfo("Trial", f"{14-stat} days left of your trial.")
+    elif stat > 14:
+        messagebox.showwarning("Trial period ended.", "Your 14-day trial has ended.")
+        close_app()
+        return
+    if status_var.get() == "Verifying license...":
+        status_var.set("Ready")
 
 # ================================= Navigation functions ===================================
 def show_main():
@@ -579,19 +843,19 @@ def show_main():
     sequence_frame.pack_forget()
     main_tab.pack(expand=True, fill=BOTH, padx=5, pady=5)
     settings_active = False
-    if os.path.exists("client/pause_listener.trigger"):
-        os.remove("client/pause_listener.trigger")
-    print("Main page shown, triggers resumed")
+    pause_hotkeys(False)
+    print("Main page shown, hotkeys resumed")
 
 def show_sequences():
     global settings_active
     main_tab.pack_forget()
     settings_frame.pack_forget()
     sequence_frame.pack(expand=True, fill=BOTH, padx=5, pady=5)
+    if not library_scanned:
+        refresh_sequence_list()
     settings_active = False
-    if os.path.exists("client/pause_listener.trigger"):
-        os.remove("client/pause_listener.trigger")
-    print("Sequences page shown, triggers resumed")
+    pause_hotkeys(False)
+    print("Sequences page shown, hotkeys resumed")
 
 def show_settings():
     # center_window(root, 230, 255)
@@ -600,11 +864,45 @@ def show_settings():
     sequence_frame.pack_forget()
     info_frm.pack_forget()
     act_frm.pack_forget()
+    playback_frm.pack_forget()
     settings_frame.pack(expand=True, fill=BOTH, padx=5, pady=5)
     settings_active = True
-    with open("client/pause_listener.trigger", "w") as f:
-        f.write("")  # Create pause signal for key_listener.py
-    print("Settings page shown, triggers paused")
+    pause_hotkeys(True)
+    print("Settings page shown, hotkeys paused")
+
+def show_playback():
+    options = current_playback_options()
+    for name, var in playback_vars.items():
+        var.set(f"{options[name]:g}")
+    named = current_sequence_name != "Untitled"
+    per_sequence_var.set(bool(sequence_options) and named)
+    per_sequence_check.config(text=f"Only for {current_sequence_name}" if named else "Only for this sequence",
+                              state=NORMAL if named else DISABLED)
+    settings_frame.pack_forget()
+    playback_frm.pack(expand=True, fill=BOTH, padx=5, pady=5)
+
+def apply_playback():
+    global sequence_options
+    try:
+        options = validate_options({name: var.get() for name, var in playback_vars.items()})
+    except ValueError as e:
+        messagebox.showerror("Error", f"Invalid playback option: {e}")
+        return
+    try:
+        if per_sequence_var.get() and current_sequence_name != "Untitled":
+            sequence_options = options
+            save_sequence_options(current_sequence_dir, current_sequence_name, options)
+        else:
+            playback_settings.update(options)
+            if sequence_options:
+                sequence_options = {}
+                save_sequence_options(current_sequence_dir, current_sequence_name, None)
+            save_keybinds_to_file()
+    except OSError as e:
+        messagebox.showerror("Error", f"Failed to save playback options: {e}")
+        return
+    print("Playback options updated:", current_playback_options())
+    show_settings()
 
 def show_info():
     # content = find_txt()
@@ -658,12 +956,22 @@ act_frm = None
 sk_entry = None
 act_lbl = None
 info_lbl = None
+sequence_rows = None
+sequence_offset = 0
+sequence_scrollbar = None
+empty_sequence_label = None
+playback_frm = None
+playback_vars = {}
+per_sequence_var = None
+per_sequence_check = None
 
 
 
 def create_gui():
     global status_var, app_name_var, root, main_tab, settings_frame, sequence_frame, ser_key, sk_entry, info_lbl
     global title_label, sequence_title_frame, mouse_listener, keyboard_listener, info_frm, act_frm, act_lbl
+    global playback_frm, per_sequence_var, per_sequence_check
+    global sequence_rows, sequence_scrollbar, empty_sequence_label
 
     root = ttk.Window(themename='darkly')
     root.overrideredirect(True)
@@ -787,12 +1095,12 @@ def create_gui():
     keybind_row = ttk.Frame(settings_frame)
     keybind_row.pack(pady=2, padx=10, fill="x")
 
-    for action, (modifier, key) in keybinds.items():
+    for action, binding in keybinds.items():
         # Create a frame for each keybind pair to keep label and keybind together
         frame = ttk.Frame(keybind_row, height=20, width=10)
         frame.pack(side="left", padx=5)  # Pack frames horizontally
         ttk.Label(frame, text=action_labels[action], width=12, anchor='center').pack(side="top")
-        label_key = ttk.Label(frame, text=f"{modifier}+{key}", font=("Arial", 10), 
+        label_key = ttk.Label(frame, text=format_binding(binding), font=("Arial", 10), 
                               cursor="hand2", style=INFO)
         label_key.pack(side="bottom")
         label_key.bind("<Button-1>", lambda event, a=action, l=label_key: record_keybind(l, a))
@@ -803,6 +1111,21 @@ def create_gui():
     ttk.Button(main_btn_frame, text="Default", command=reset_to_defaults, bootstyle=WARNING).grid(row=0, column=1, padx=2)
     ttk.Button(main_btn_frame, text="Back", command=show_main, bootstyle=SECONDARY).grid(row=0, column=2, padx=2)
     ttk.Button(main_btn_frame, text="i", command=show_info, bootstyle=SECONDARY).grid(row=0, column=3, padx=2)
+    ttk.Button(main_btn_frame, text="⏱", command=show_playback, bootstyle=SECONDARY).grid(row=0, column=4, padx=2)
+
+    playback_frm = ttk.Frame(root)
+    for name, label, row, column in [("speed", "Speed:", 0, 0), ("max_gap", "Max gap:", 0, 2),
+                                     ("loop_min", "Loop (s):", 1, 0), ("loop_max", "to", 1, 2)]:
+        playback_vars[name] = ttk.StringVar()
+        ttk.Label(playback_frm, text=label).grid(row=row, column=column, padx=2, pady=2, sticky='e')
+        ttk.Entry(playback_frm, textvariable=playback_vars[name], width=5).grid(row=row, column=column + 1, padx=2, pady=2)
+    per_sequence_var = ttk.BooleanVar()
+    per_sequence_check = ttk.Checkbutton(playback_frm, variable=per_sequence_var, text="Only for this sequence")
+    per_sequence_check.grid(row=2, column=0, columnspan=4, pady=2)
+    playback_btn_frame = ttk.Frame(playback_frm)
+    playback_btn_frame.grid(row=3, column=0, columnspan=4, pady=2)
+    ttk.Button(playback_btn_frame, text="Apply", command=apply_playback, bootstyle=SUCCESS).pack(side=LEFT, padx=2)
+    ttk.Button(playback_btn_frame, text="Back", command=show_settings, bootstyle=SECONDARY).pack(side=LEFT, padx=2)
     
     info_frm = ttk.Frame(root)
     info_frm.grid_columnconfigure(0, weight=1)
@@ -831,6 +1154,12 @@ def create_gui():
     ttk.Label(sequence_title_frame, text="Saved Sequences", font=("Arial", 10, "bold")).pack(side=LEFT)
     ttk.Button(sequence_title_frame, text="↻", width=2, command=refresh_sequence_list, bootstyle=INFO).pack(side=RIGHT, padx=2)
     ttk.Button(sequence_title_frame, text="Back", command=show_main, bootstyle=SECONDARY).pack(side=RIGHT, padx=2)
+    sequence_scrollbar = ttk.Scrollbar(sequence_frame, orient=VERTICAL, command=scroll_sequences)
+    sequence_scrollbar.pack(side=RIGHT, fill=Y)
+    sequence_list = ttk.Frame(sequence_frame)
+    sequence_list.pack(side=LEFT, expand=True, fill=BOTH)
+    empty_sequence_label = ttk.Label(sequence_list, text="No saved sequences found", bootstyle="secondary")
+    sequence_rows = [create_sequence_row(sequence_list) for _ in range(VISIBLE_SEQUENCE_ROWS)]
 
     
     for key in [Key.shift_l, Key.shift_r, Key.ctrl_l, Key.ctrl_r, Key.alt_l, Key.alt_r]:
@@ -841,24 +1170,16 @@ def create_gui():
     mouse_listener.start()
     keyboard_listener.start()
     
-    start_key_listener()
+    hw_provider.start()  # resolve the hardware ID while the rest of the GUI starts
+    # hotkeys and the license check run off the Tk thread; results come back through post_to_ui
+    root.bind("<<UiCall>>", run_ui_calls)
     load_keybinds_from_file()
-    check_for_triggers()
-    
-    stat = status_check()
-    if stat is None:
-        messagebox.showwarning("Error.", "Please relaunch the app.")
-        root.destroy()
-        return
-    elif stat == 'licensed':
-        print('LICENSED')
-    elif stat <= 14:
-        messagebox.showinfo("Trial", f"{14-stat} days left of your trial.")
-    elif stat > 14:
-        messagebox.showwarning("Trial period ended.", "Your 14-day trial has ended.")
-        root.destroy()
-        return
-    
+    hotkeys.load(keybinds)
+    keybinds_watcher.start()
+
+    status_var.set("Verifying license...")
+    start_status_check(lambda stat: post_to_ui(on_license_status, stat))
+
     root.attributes('-topmost', True)
     root.after(100, lambda: root.attributes('-topmost', False))
     on_start_app(window_w, window_h)
@@ -1,13 +1,21 @@
 import requests
-import wmi
 from datetime import datetime
 import ctypes
 import os
 import json
+import threading
+import time
+
+from modules.hw_id import hw_provider
+from modules.transport import transport
+from modules.cache_store import CacheStore, TRIAL_FILE
 
-TRIAL_FILE = "client/cache.txt"
 KEY_PATH = "client/serial_key.txt"
 
+# Status check attempts, and the delay before the first retry (doubled after each failure)
+STATUS_ATTEMPTS = 4
+STATUS_BACKOFF = 0.5
+
 def read_serial(KEY_PATH):
     try:
         if not os.path.exists(KEY_PATH):
@@ -29,82 +37,16 @@ def read_serial(KEY_PATH):
         return None
 
 def get_hardware_ids():
-    try:
-        c = wmi.WMI()
-        hardware_ids = []
-        
-        # Motherboard
-        for board in c.Win32_BaseBoard():
-            hardware_ids.append(board.SerialNumber.strip() if board.SerialNumber else "Not Available")
-        
-        # CPU
-        for cpu in c.Win32_Processor():
-            hardware_ids.append(cpu.ProcessorId.strip() if cpu.ProcessorId else "Not Available")
-        
-        # RAM
-        ram_ids = [ram.SerialNumber.strip() if ram.SerialNumber else "Not Available" for ram in c.Win32_PhysicalMemory()]
-        hardware_ids.extend(ram_ids if ram_ids else ["Not Available"])
-        
-        # Disk
-        disk_ids = [disk.SerialNumber.strip() if disk.SerialNumber else "Not Available" for disk in c.Win32_DiskDrive()]
-        hardware_ids.extend(disk_ids if disk_ids else ["Not Available"])
-        
-        # BIOS
-        for bios in c.Win32_BIOS():
-            hardware_ids.append(bios.SerialNumber.strip() if bios.SerialNumber else "Not Available")
-        
-        # Network
-        net_ids = [net.MACAddress.strip() for net in c.Win32_NetworkAdapter() if net.MACAddress]
-        hardware_ids.extend(net_ids if net_ids else ["Not Available"])
-        
-        # GPU
-        gpu_ids = [gpu.PNPDeviceID.strip() if gpu.PNPDeviceID else "Not Available" for gpu in c.Win32_VideoController()]
-        hardware_ids.extend(gpu_ids if gpu_ids else ["Not Available"])
-        
-        if not hardware_ids:
-            return None
-        
-        # Join all IDs with '|'
-        joined_hw_id = "|".join(hardware_ids)
-        filter1 = joined_hw_id.replace('\\','/' )
-        filter2 = filter1.replace(' ', '_')
-        return filter2
+    return hw_provider.get()
 
-    except Exception as e:
-        print(f"Error retrieving hardware IDs: {e}")
-        return None
-
-    except Exception as e:
-        print(f"Error retrieving hardware IDs: {e}")
-        return None
+cache_store = CacheStore(TRIAL_FILE, hw_id_source=get_hardware_ids)
 
 def read_cache(data=None):
+    """Return the offline license cache, storing data first if given."""
     try:
-        if not os.path.isfile(TRIAL_FILE) and data is None:
-            os.makedirs(os.path.dirname(TRIAL_FILE), exist_ok=True)
-            with open(TRIAL_FILE, "w", encoding="utf-8") as f:
-                f.write("")  # Create an empty cache file if not present
-            print("CACHE NOT FOUND..... CACHE CREATED.")
-            return None
-        
-        if data is not None:  # has data
-            print("WRITING DATA TO CACHE")
-            with open(TRIAL_FILE, "w", encoding="utf-8") as f:
-                # Serialize the data to JSON before writing to the file
-                json.dump(data, f)  # Write as JSON
-
-        print("READING CACHE")
-        with open(TRIAL_FILE, "r", encoding="utf-8") as f:
-            txt_content = f.read()
-
-        print(f"CACHE CONTENT: {txt_content}")
-        
-        if txt_content:
-            # Deserialize the JSON content back to Python objects
-            return json.loads(txt_content)
-        else:
-            return None
-    
+        if data is not None:
+            return cache_store.set(data)
+        return cache_store.get()
     except PermissionError as e:
         print(f"Permission denied at {TRIAL_FILE}. Operation: {e}")
         return None
@@ -112,9 +54,6 @@ def read_cache(data=None):
         print(f"Unexpected error: {e}")
         return None
 
-hw_id = get_hardware_ids()
-cache = read_cache()
-
 def status_check():
     key = read_serial(KEY_PATH)
     if not key:
@@ -123,9 +62,46 @@ def status_check():
     if status == False:
         return check_cache()
     else:
+        legacy_hw_id = find_legacy_hw_id()
+        if legacy_hw_id:
+            # move the device and its license to the fingerprint, or /validate stops recognising it
+            register_device(legacy_hw_id=legacy_hw_id)
         return 'licensed'
 
+def status_check_with_backoff():
+    """Run status_check, retrying with exponential backoff while it cannot reach a verdict."""
+    delay = STATUS_BACKOFF
+    for attempt in range(1, STATUS_ATTEMPTS + 1):
+        stat = status_check()
+        if stat is not None:
+            return stat
+        if attempt < STATUS_ATTEMPTS:
+            print(f"Status check failed (attempt {attempt}), retrying in {delay}s")
+            time.sleep(delay)
+            delay *= 2
+    return None
+
+def start_status_check(on_result):
+    """Run the licensing status check on a background thread and hand the result to on_result."""
+    def run():
+        on_result(status_check_with_backoff())
+    threading.Thread(target=run, daemon=True).start()
+
+def find_legacy_hw_id():
+    """The pipe-joined id this device is still registered under, or None once it uses the fingerprint."""
+    cache = read_cache()
+    hw_id = get_hardware_ids()
+    cached_hw_id = cache.get('data', {}).get('hardware_id') if cache else cache_store.legacy_hw_id
+    if hw_id and cached_hw_id and cached_hw_id != hw_id and "|" in cached_hw_id:
+        return cached_hw_id
+    return None
+
 def check_cache():
+    cache = read_cache()
+    legacy_hw_id = find_legacy_hw_id()
+    if legacy_hw_id:
+        # registered under the old pipe-joined id: let the server move it to the fingerprint
+        return register_device(legacy_hw_id=legacy_hw_id)
     if cache is not None:
         data = update_lastcon()
         print('UPDATING SERVER')
@@ -142,18 +118,20 @@ def set_hidden_windows(file_path):
     except Exception as e:
         print(f"Error hiding file: {e}", flush=True)
 
-def register_device():
-    API_URL = "http://127.0.0.1:8000/reg_dev"
+def register_device(legacy_hw_id=None):
     date_now = datetime.now().isoformat()
+    hw_id = get_hardware_ids()
 
     if not hw_id:
         print("❌ Failed to generate hardware ID")
         return None
 
     payload = {"hw_id": hw_id, 'date':date_now}
+    if legacy_hw_id:
+        payload["legacy_hw_id"] = legacy_hw_id
 
     try:
-        response = requests.post(API_URL, json=payload, timeout=5)
+        response = transport.post("/reg_dev", payload)
         response.raise_for_status()  # Raises an error for HTTP issues
 
         try:
@@ -175,16 +153,15 @@ def register_device():
         return None
 
 def update_lastcon():
-    # hw_id: str = get_hardware_ids()
+    hw_id = get_hardware_ids()
     user_date = datetime.now().isoformat()
     if hw_id is None:
         print("❌ Failed to get hardware IDs")
         return None
     
-    API_URL = "http://127.0.0.1:8000/lastcon"
     payload = {"hw_id": hw_id, "date": user_date}
     try:
-        response = requests.post(API_URL, json=payload)
+        response = transport.post("/lastcon", payload)
         response.raise_for_status()
         data = response.json()
         return data
@@ -194,7 +171,6 @@ def update_lastcon():
         return None
     
 def validate_key(key):
-    API_URL = "http://127.0.0.1:8000/validate"
     hw_id = get_hardware_ids()
     date = datetime.now().isoformat()
     
@@ -205,7 +181,7 @@ def validate_key(key):
     payload = {"key": key, "hw_id": hw_id, "date": date}
     
     try:
-        response = requests.post(API_URL, json=payload, timeout=10)
+        response = transport.post("/validate", payload)
         response.raise_for_status()
         data = response.json()
         if data.get('key') == key:
@@ -246,13 +222,13 @@ def count_days(cache):
         return None
 
 def check_license(key):
-    API_URL = "http://127.0.0.1:8000/license"
+    hw_id = get_hardware_ids()
     if not hw_id:
         print("❌ Failed to generate hardware ID")
         return None
     payload = {"key": key, "hw_id": hw_id}
     try:
-        response = requests.post(API_URL, json=payload)
+        response = transport.post("/license", payload)
         response.raise_for_status()
         data = response.json()
         if data.get('key') == 'valid':
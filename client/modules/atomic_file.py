@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+def atomic_write(path, data):
+    """Replace path with data (str or bytes); readers see the old file or the new one, never a mix.
+
+    The data goes to a uniquely named temp file in the same directory, so
+    concurrent writers never share one, and is fsynced before os.replace.
+    The temp file is removed if anything fails.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+from modules.atomic_file import atomic_write
+
+TRIAL_FILE = "client/cache.txt"
+# Hex of the server's Ed25519 public key (the pair of CACHE_SIGNING_KEY), shipped with the client
+PUBLIC_KEY_FILE = "client/cache_key.pub"
+
+def _canonical(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def load_public_key(path=PUBLIC_KEY_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return Ed25519PublicKey.from_public_bytes(bytes.fromhex(f.read().strip()))
+    except FileNotFoundError:
+        print(f"{path} not found, offline license cache disabled")
+    except (OSError, ValueError) as e:
+        print(f"Error reading {path}: {e}, offline license cache disabled")
+    return None
+
+class CacheStore:
+    """Offline license cache kept in memory and written atomically when it changes.
+
+    The file holds the server's /reg_dev or /lastcon response as received,
+    including "sig": the server's Ed25519 signature over the device row.
+    Only the server holds the private key, so registered_at cannot be
+    edited offline. A cache that is unsigned, fails verification or belongs
+    to another hardware ID is ignored, and the client re-registers to get
+    registered_at from the server again.
+    """
+
+    def __init__(self, path=TRIAL_FILE, hw_id_source=None, public_key=None):
+        self.path = path
+        self.hw_id_source = hw_id_source
+        self.public_key = public_key if public_key is not None else load_public_key()
+        # hardware_id from a cache we could not verify; only a hint for moving off the legacy id
+        self.legacy_hw_id = None
+        self._data = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if not self._loaded:
+                self._data = self._load()
+                self._loaded = True
+            return self._data
+
+    def set(self, data):
+        """Hold a fresh server response; it is only written to disk if the server signed it."""
+        current = self.get()
+        with self._lock:
+            if data == current:
+                return current
+            if self._verify(data):
+                self._write(data)
+                self.legacy_hw_id = None
+            else:
+                print("Server response not signed, not keeping it for offline use")
+            self._data = data
+            return data
+
+    def _verify(self, data):
+        """True if data is a signed device row for this machine."""
+        if self.public_key is None or not isinstance(data, dict):
+            return False
+        device, sig = data.get("data"), data.get("sig")
+        if not isinstance(device, dict) or not isinstance(sig, str):
+            return False
+        try:
+            self.public_key.verify(bytes.fromhex(sig), _canonical(device))
+        except (InvalidSignature, ValueError):
+            return False
+        hw_id = self.hw_id_source() if self.hw_id_source else None
+        return hw_id is not None and device.get("hardware_id") == hw_id
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            print("CACHE NOT FOUND")
+            return None
+        except OSError as e:
+            print(f"Error reading cache {self.path}: {e}")
+            return None
+        if not content.strip():
+            return None
+
+        try:
+            stored = json.loads(content)
+        except ValueError:
+            print("CACHE CORRUPT, ignoring it")
+            return None
+        if self._verify(stored):
+            return stored
+
+        # unsigned, tampered or from another machine: its dates cannot be trusted, but its
+        # hardware_id tells the server which legacy device to move to the fingerprint
+        print("CACHE NOT VERIFIED, ignoring it")
+        if isinstance(stored, dict) and isinstance(stored.get("data"), dict):
+            self.legacy_hw_id = stored["data"].get("hardware_id")
+        return None
+
+    def _write(self, data):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write(self.path, json.dumps(data))
@@ -0,0 +1,108 @@
+import threading
+from array import array
+
+from modules.sequence_file import ACTION_CODES, ACTIONS, CLICK, MOVE
+
+# Events added per growth step; columns are extended this much at a time
+CHUNK_EVENTS = 16384
+
+class EventBuffer:
+    """Columnar store for recorded (action, data, time) events.
+
+    Each event is a slot in five typed arrays (type, key code, time, x, y)
+    instead of a tuple of Python objects, 19 bytes per event with no
+    allocation in the input callbacks. Keys and buttons are interned in a
+    small table, like the .seq string table. Iterating yields the same
+    tuples the list used to hold, so playback and saving work unchanged.
+    """
+
+    def __init__(self, events=()):
+        self._kinds = array("B")
+        self._codes = array("H")
+        self._times = array("d")
+        self._xs = array("i")
+        self._ys = array("i")
+        self._size = 0
+        self._keys = []
+        self._key_codes = {}
+        self._lock = threading.Lock()  # mouse and keyboard callbacks arrive on different threads
+        for event in events:
+            self.append(event)
+
+    def _grow(self):
+        self._kinds.extend(bytes(CHUNK_EVENTS))
+        self._codes.extend(array("H", bytes(2 * CHUNK_EVENTS)))
+        self._times.extend(array("d", bytes(8 * CHUNK_EVENTS)))
+        self._xs.extend(array("i", bytes(4 * CHUNK_EVENTS)))
+        self._ys.extend(array("i", bytes(4 * CHUNK_EVENTS)))
+
+    def _code_for(self, key):
+        code = self._key_codes.get(key)
+        if code is None:
+            code = self._key_codes[key] = len(self._keys)
+            self._keys.append(key)
+        return code
+
+    def _add(self, kind, code, event_time, x, y):
+        with self._lock:
+            i = self._size
+            if i == len(self._times):
+                self._grow()
+            self._kinds[i] = kind
+            self._codes[i] = code
+            self._times[i] = event_time
+            self._xs[i] = x
+            self._ys[i] = y
+            self._size = i + 1
+
+    def add_move(self, x, y, event_time):
+        self._add(MOVE, 0, event_time, int(x), int(y))
+
+    def add_click(self, x, y, button, event_time):
+        with self._lock:
+            code = self._code_for(button)
+        self._add(CLICK, code, event_time, int(x), int(y))
+
+    def add_key(self, action, key, event_time):
+        with self._lock:
+            code = self._code_for(key)
+        self._add(ACTION_CODES[action], code, event_time, 0, 0)
+
+    def append(self, event):
+        """List-compatible append of an (action, data, time) tuple."""
+        action, data, event_time = event
+        if action == "move":
+            self.add_move(data[0], data[1], event_time)
+        elif action == "click":
+            self.add_click(data[0], data[1], data[2], event_time)
+        else:
+            self.add_key(action, data, event_time)
+
+    def _event(self, i):
+        kind = self._kinds[i]
+        if kind == MOVE:
+            data = (self._xs[i], self._ys[i])
+        elif kind == CLICK:
+            data = (self._xs[i], self._ys[i], self._keys[self._codes[i]])
+        else:
+            data = self._keys[self._codes[i]]
+        return ACTIONS[kind], data, self._times[i]
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        # events recorded after iteration starts are not included
+        for i in range(self._size):
+            yield self._event(i)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("event index out of range")
+        return self._event(index)
+
+    def nbytes(self):
+        """Bytes held by the columns, including unused capacity."""
+        return sum(col.itemsize * len(col) for col in (self._kinds, self._codes, self._times, self._xs, self._ys))
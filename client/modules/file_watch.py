@@ -0,0 +1,141 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+# Seconds to wait for writes to settle before reporting a change
+WATCH_DEBOUNCE = 0.2
+# Seconds between checks where inotify is not available
+POLL_INTERVAL = 2
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+def _inotify():
+    """libc with inotify, or None off Linux."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        return None
+    return libc
+
+class FileWatcher:
+    """Calls on_change() from a background thread after path is written or replaced.
+
+    On Linux this blocks on inotify for the file's directory (so atomic
+    replaces are seen too) and does nothing between changes; elsewhere it
+    falls back to comparing mtime and size every POLL_INTERVAL seconds.
+    Bursts of writes within WATCH_DEBOUNCE seconds are reported once.
+    """
+
+    def __init__(self, path, on_change, debounce=WATCH_DEBOUNCE, poll_interval=POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wake_r = self._wake_w = None
+        self._wake_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, args=(_inotify(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._wake_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"x")  # wake the select() in the inotify loop
+
+    def _run(self, libc):
+        try:
+            if libc:
+                self._watch_inotify(libc)
+            else:
+                self._watch_poll()
+        finally:
+            with self._wake_lock:
+                os.close(self._wake_r)
+                os.close(self._wake_w)
+                self._wake_r = self._wake_w = None
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Error handling change to {self.path}: {e}")
+
+    def _watch_inotify(self, libc):
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling {self.path}")
+            return self._watch_poll()
+        directory, name = os.path.split(self.path)
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+            print(f"Cannot watch {directory} ({os.strerror(ctypes.get_errno())}), polling {self.path}")
+            os.close(fd)
+            return self._watch_poll()
+        name = name.encode()
+        try:
+            while True:
+                select.select([fd, self._wake_r], [], [])
+                if self._stop.is_set():
+                    return
+                if not self._read_events(fd, name):
+                    continue
+                # debounce: keep draining until the directory is quiet for a moment
+                while True:
+                    ready = select.select([fd, self._wake_r], [], [], self.debounce)[0]
+                    if self._stop.is_set():
+                        return
+                    if fd not in ready:
+                        break
+                    self._read_events(fd, name)
+                self._notify()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read_events(fd, name):
+        """Read pending inotify events; True if any were for the watched file."""
+        data = os.read(fd, 64 * 1024)
+        offset = 0
+        matched = False
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            if data[offset:offset + length].rstrip(b"\0") == name:
+                matched = True
+            offset += length
+        return matched
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _watch_poll(self):
+        last = self._stat()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat()
+            if current == last:
+                continue
+            if self._stop.wait(self.debounce):
+                return
+            last = self._stat()
+            self._notify()
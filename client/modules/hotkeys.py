@@ -0,0 +1,158 @@
+import time
+
+from pynput.keyboard import Key
+
+# Special keys mapping
+SPECIAL_KEYS = {k.name: k for k in [
+    Key.f1, Key.f2, Key.f3, Key.f4, Key.f5, Key.f6,
+    Key.f7, Key.f8, Key.f9, Key.f10, Key.f11, Key.f12,
+    Key.ctrl_l, Key.alt_l, Key.shift_l, Key.enter, Key.space
+]}
+
+# Modifier key names as pynput reports them, folded to one name per modifier
+MODIFIERS = {
+    "shift": "shift", "shift_l": "shift", "shift_r": "shift",
+    "ctrl": "ctrl", "ctrl_l": "ctrl", "ctrl_r": "ctrl",
+    "alt": "alt", "alt_l": "alt", "alt_r": "alt", "alt_gr": "alt",
+    "cmd": "cmd", "cmd_l": "cmd", "cmd_r": "cmd",
+}
+# Other special keys that can be held like a modifier, as in the original ["f5", "r"] bindings
+HOLD_KEYS = {name for name in SPECIAL_KEYS if name not in MODIFIERS}
+# Seconds allowed between the steps of a sequence like "g g"
+SEQUENCE_TIMEOUT = 1.0
+
+def parse_binding(value):
+    """Turn a keybinds.json value into a tuple of (modifiers, key) chords.
+
+    Accepts the original ["shift_l", "r"] lists (held keys then one key), or
+    strings where "+" joins a chord and spaces separate sequence steps:
+    "ctrl+shift+r", "f5+r", "g g". Held keys are modifiers or HOLD_KEYS.
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, (list, tuple)):
+        steps = ["+".join(value)]
+    elif isinstance(value, str):
+        steps = value.split()
+    else:
+        raise ValueError(f"binding must be a list or string, not {type(value).__name__}")
+    if not steps:
+        raise ValueError("empty binding")
+    chords = []
+    for step in steps:
+        *modifier_names, key_name = step.lower().split("+")
+        modifiers = set()
+        for name in modifier_names:
+            if name in MODIFIERS:
+                modifiers.add(MODIFIERS[name])
+            elif name in HOLD_KEYS:
+                modifiers.add(name)
+            else:
+                raise ValueError(f"{name!r} is not a modifier")
+        if key_name in MODIFIERS or not (len(key_name) == 1 or key_name in Key.__members__):
+            raise ValueError(f"{key_name!r} is not a key")
+        chords.append((frozenset(modifiers), key_name))
+    return tuple(chords)
+
+def format_binding(value):
+    """Display form of a keybinds.json value, e.g. "shift_l+r" or "g g"."""
+    if isinstance(value, (list, tuple)):
+        return "+".join(value)
+    return str(value)
+
+def normalize_key(key):
+    """Key name the table is keyed by: lowercase char, or the pynput Key name."""
+    if isinstance(key, Key):
+        return key.name
+    char = getattr(key, "char", None)
+    if char and char.isprintable():
+        return char.lower()
+    # with ctrl held, Windows reports control characters; the virtual key code still names the key
+    vk = getattr(key, "vk", None)
+    if vk is not None and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A):
+        return chr(vk).lower()
+    return None
+
+class HotkeyEngine:
+    """Matches keybinds.json bindings on the app's own keyboard listener.
+
+    Bindings are compiled into a table keyed by (held keys, key), with
+    nested tables for multi-step sequences, so each key press is one dict
+    lookup however many bindings exist. When a binding matches,
+    on_action(action) is called on the listener thread, so it should hand
+    off to the UI (post_to_ui) rather than do the work.
+    """
+
+    def __init__(self, on_action):
+        self.on_action = on_action
+        self.table = {}
+        self.paused = False
+        self._modifiers = set()
+        self._down = set()
+        self._pending = None
+        self._pending_deadline = 0.0
+
+    def load(self, keybinds):
+        """Compile {action: binding} as stored in keybinds.json; bad bindings are skipped."""
+        table = {}
+        loaded = {}
+        for action, value in keybinds.items():
+            try:
+                chords = parse_binding(value)
+            except ValueError as e:
+                print(f"Skipping hotkey for {action}: {e}")
+                continue
+            node = table
+            for chord in chords[:-1]:
+                node = node.setdefault(chord, {})
+                if not isinstance(node, dict):
+                    break
+            else:
+                if chords[-1] in node:
+                    print(f"Skipping hotkey for {action}: {format_binding(value)} clashes with another binding")
+                    continue
+                node[chords[-1]] = action
+                loaded[action] = format_binding(value)
+                continue
+            print(f"Skipping hotkey for {action}: {format_binding(value)} starts with another binding")
+        self.table = table  # swapped in one step; the listener thread never sees a half-built table
+        self._pending = None
+        print("Hotkeys loaded:", loaded)
+
+    def set_paused(self, paused):
+        self.paused = paused
+        self._modifiers.clear()
+        self._down.clear()
+        self._pending = None
+
+    def on_press(self, key):
+        if self.paused:
+            return
+        if isinstance(key, Key) and key.name in MODIFIERS:
+            self._modifiers.add(MODIFIERS[key.name])
+            return
+        name = normalize_key(key)
+        if name is None or name in self._down:
+            return  # unknown key, or auto-repeat of a held one
+        chord = (frozenset(self._modifiers | (self._down & HOLD_KEYS)), name)
+        self._down.add(name)
+
+        match = None
+        if self._pending is not None and time.monotonic() < self._pending_deadline:
+            match = self._pending.get(chord)
+        if match is None:
+            match = self.table.get(chord)  # a broken sequence may still start a new binding
+        if isinstance(match, dict):
+            self._pending = match
+            self._pending_deadline = time.monotonic() + SEQUENCE_TIMEOUT
+            return
+        self._pending = None
+        if match is not None:
+            self.on_action(match)
+
+    def on_release(self, key):
+        if self.paused:
+            return
+        if isinstance(key, Key) and key.name in MODIFIERS:
+            self._modifiers.discard(MODIFIERS[key.name])
+            return
+        self._down.discard(normalize_key(key))
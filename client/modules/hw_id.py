@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import wmi
+    import pythoncom
+except ImportError:  # not on Windows
+    wmi = None
+    pythoncom = None
+
+from modules.atomic_file import atomic_write
+
+HW_ID_FILE = "client/hw_id.json"
+
+# Seconds to wait for each hardware source; all sources are read in parallel
+HW_SOURCE_TIMEOUT = 5
+
+def read_sources(sources, timeout=HW_SOURCE_TIMEOUT):
+    """Run each source on its own daemon thread and collect what finishes within timeout.
+
+    A source that hangs (a stuck WMI query, an unresponsive disk) is skipped
+    and left to die with the process rather than blocking startup.
+    """
+    results = {}
+    threads = []
+    for name, read in sources.items():
+        def run(name=name, read=read):
+            try:
+                results[name] = read()
+            except Exception as e:
+                print(f"Error reading hardware source {name}: {e}")
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        threads.append((name, thread))
+
+    deadline = time.monotonic() + timeout
+    for name, thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"Hardware source {name} timed out after {timeout}s")
+    components = []
+    for name, _ in threads:
+        components.extend(results.get(name, []))
+    return components
+
+def _clean(kind, values):
+    return [f"{kind}:{v.strip()}" for v in values if v and v.strip()]
+
+class WindowsProvider:
+    """Hardware serials from WMI, one query per device class."""
+
+    QUERIES = {
+        "board": ("Win32_BaseBoard", "SerialNumber"),
+        "cpu": ("Win32_Processor", "ProcessorId"),
+        "ram": ("Win32_PhysicalMemory", "SerialNumber"),
+        "disk": ("Win32_DiskDrive", "SerialNumber"),
+        "bios": ("Win32_BIOS", "SerialNumber"),
+        "mac": ("Win32_NetworkAdapter", "MACAddress"),
+        "gpu": ("Win32_VideoController", "PNPDeviceID"),
+    }
+
+    def sources(self):
+        return {kind: self._query(kind, cls, attr) for kind, (cls, attr) in self.QUERIES.items()}
+
+    @staticmethod
+    def _query(kind, cls, attr):
+        def read():
+            pythoncom.CoInitialize()  # WMI is COM, and each source runs on its own thread
+            try:
+                return _clean(kind, [getattr(item, attr) for item in getattr(wmi.WMI(), cls)()])
+            finally:
+                pythoncom.CoUninitialize()
+        return read
+
+class LinuxProvider:
+    """Hardware serials from sysfs and procfs; unreadable (root-only) files are skipped.
+
+    Only per-unit values count: BIOS versions and CPU model strings are the
+    same on every machine of a model, so they are left out.
+    """
+
+    DMI_FIELDS = ["board_serial", "product_serial", "product_uuid", "chassis_serial"]
+
+    def sources(self):
+        return {
+            "dmi": self._dmi,
+            "cpu": self._cpu,
+            "mac": self._macs,
+            "disk": self._disks,
+        }
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _dmi(self):
+        return _clean("dmi", [self._read(f"/sys/class/dmi/id/{field}") for field in self.DMI_FIELDS])
+
+    def _cpu(self):
+        # ARM boards report a "Serial" line; x86 has no CPU serial
+        for line in (self._read("/proc/cpuinfo") or "").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "Serial":
+                return _clean("cpu", [value])
+        return []
+
+    def _macs(self):
+        # only interfaces backed by a physical device, so docker/veth/vpn links do not count
+        macs = []
+        for name in sorted(os.listdir("/sys/class/net")):
+            if not os.path.exists(f"/sys/class/net/{name}/device"):
+                continue
+            mac = self._read(f"/sys/class/net/{name}/address")
+            if mac and mac != "00:00:00:00:00:00":
+                macs.append(mac)
+        return _clean("mac", macs)
+
+    def _disks(self):
+        return _clean("disk", [self._read(f"/sys/block/{name}/device/serial") for name in sorted(os.listdir("/sys/block"))])
+
+class FakeProvider:
+    """Deterministic components for tests and headless benchmarks."""
+
+    def __init__(self, components=None):
+        env = os.getenv("ANTI_IDLE_FAKE_HW")
+        self.components = components or (env.split(",") if env else ["board:FAKE-BOARD", "cpu:FAKE-CPU", "mac:00:11:22:33:44:55"])
+
+    def sources(self):
+        return {"fake": lambda: list(self.components)}
+
+def get_provider():
+    """Pick a provider from ANTI_IDLE_HW_PROVIDER (windows/linux/fake) or the platform."""
+    name = os.getenv("ANTI_IDLE_HW_PROVIDER") or ("windows" if sys.platform == "win32" else "linux")
+    providers = {"windows": WindowsProvider, "linux": LinuxProvider, "fake": FakeProvider}
+    if name not in providers:
+        print(f"Unknown hardware provider {name}, using linux")
+        name = "linux"
+    return providers[name]()
+
+def get_hardware_components(provider=None):
+    """List the machine's hardware serials as "kind:serial" strings."""
+    return read_sources((provider or get_provider()).sources())
+
+def make_fingerprint(components):
+    """Return the hw_id for a list of hardware serials, or None if there are none.
+
+    hw_id is a fixed 32-char digest over the sorted, de-duplicated serials, so
+    adapter order does not matter.
+    """
+    normalized = sorted({c.upper() for c in components})
+    if not normalized:
+        return None
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()[:32]
+
+def boot_id():
+    """Something that changes on every boot, or None if we cannot tell."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    try:
+        import ctypes
+        ctypes.windll.kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+        uptime = ctypes.windll.kernel32.GetTickCount64() / 1000
+        # boot time to the minute, so clock jitter does not look like a reboot
+        return str(int((time.time() - uptime) // 60))
+    except Exception:
+        return None
+
+def machine_stamp():
+    """Cheap checks that a persisted hw_id still belongs to this machine."""
+    return {"boot": boot_id(), "node": uuid.getnode(), "host": platform.node()}
+
+class HardwareIdProvider:
+    """Resolves the hardware fingerprint on a background thread, at most once per boot.
+
+    The result is persisted with a machine stamp. On a later launch the stored
+    value is used straight away if the cheap checks pass, and is only
+    recomputed (in the background) after a reboot.
+    """
+
+    def __init__(self, path=HW_ID_FILE):
+        self.path = path
+        self.hw_id = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._resolve, daemon=True)
+                self._thread.start()
+
+    def get(self, timeout=None):
+        """Return the hw_id, waiting up to timeout seconds for the first resolve."""
+        self.start()
+        self._ready.wait(timeout)
+        return self.hw_id
+
+    def _resolve(self):
+        stamp = machine_stamp()
+        stored = self._load()
+        if stored and stored.get("hw_id"):
+            old = stored.get("stamp", {})
+            if old.get("node") == stamp["node"] and old.get("host") == stamp["host"]:
+                self._set(stored["hw_id"])
+                if stamp["boot"] is not None and old.get("boot") == stamp["boot"]:
+                    print("HW ID: reused from this boot")
+                    return
+                print("HW ID: reused, re-verifying after reboot")
+
+        try:
+            hw_id = make_fingerprint(get_hardware_components())
+            if hw_id is not None:
+                self._save({"hw_id": hw_id, "stamp": stamp})
+                self._set(hw_id)
+        finally:
+            self._ready.set()  # let waiters fail fast instead of blocking
+
+    def _set(self, hw_id):
+        self.hw_id = hw_id
+        self._ready.set()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write(self.path, json.dumps(data))
+        except OSError as e:
+            print(f"Error saving hardware ID: {e}")
+
+hw_provider = HardwareIdProvider()
@@ -0,0 +1,65 @@
+import json
+import math
+import os
+import random
+
+from modules.atomic_file import atomic_write
+
+# Per-sequence overrides, kept next to the .seq files and keyed by file name
+PLAYBACK_FILE = "playback.json"
+
+def validate_options(options):
+    """Return options with numeric values; raises ValueError naming the first bad one."""
+    clean = {}
+    for name, value in options.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number")
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be a finite number")
+        if value < 0 or (name == "speed" and value == 0):
+            raise ValueError(f"{name} must be {'above' if name == 'speed' else 'at least'} 0")
+        clean[name] = value
+    if clean.get("loop_max", clean.get("loop_min", 0)) < clean.get("loop_min", 0):
+        raise ValueError("loop_max must be at least loop_min")
+    return clean
+
+def loop_interval(options):
+    """Seconds to wait before the next loop: uniform between loop_min and loop_max."""
+    return random.uniform(options["loop_min"], max(options["loop_min"], options["loop_max"]))
+
+def _read(directory):
+    try:
+        with open(os.path.join(directory, PLAYBACK_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading {PLAYBACK_FILE}: {e}")
+        return {}
+
+def _write(directory, data):
+    atomic_write(os.path.join(directory, PLAYBACK_FILE), json.dumps(data, indent=2))
+
+def load_sequence_options(directory, filename):
+    try:
+        return validate_options(_read(directory).get(filename, {}))
+    except ValueError as e:
+        print(f"Ignoring playback options for {filename}: {e}")
+        return {}
+
+def save_sequence_options(directory, filename, options):
+    """Store overrides for filename; empty options remove them."""
+    data = _read(directory)
+    if options:
+        data[filename] = options
+    elif data.pop(filename, None) is None:
+        return
+    _write(directory, data)
+
+def rename_sequence_options(directory, old_name, new_name):
+    data = _read(directory)
+    if old_name in data:
+        data[new_name] = data.pop(old_name)
+        _write(directory, data)
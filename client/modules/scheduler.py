@@ -0,0 +1,92 @@
+import threading
+import time
+
+# Wait the last stretch before a deadline by spinning; OS sleeps overshoot by up to a timer tick
+SPIN_NS = 2_000_000
+
+class PlaybackScheduler:
+    """Plays events against absolute perf_counter_ns deadlines.
+
+    Every event's deadline is the run's start plus its offset in the
+    recording, so a late event never pushes the ones after it back and
+    error does not add up over long loops. Waits sleep on the stop event
+    until close to the deadline and spin for the rest, so stop() wakes
+    playback at once.
+    """
+
+    def __init__(self, spin_ns=SPIN_NS):
+        self.spin_ns = spin_ns
+        self.stop_event = threading.Event()
+        self.last_stats = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def reset(self):
+        self.stop_event.clear()
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def wait_until(self, deadline_ns):
+        """Block until deadline_ns; returns False if stopped first."""
+        while True:
+            remaining = deadline_ns - time.perf_counter_ns()
+            if remaining <= 0:
+                return not self.stop_event.is_set()
+            if remaining > self.spin_ns:
+                if self.stop_event.wait((remaining - self.spin_ns) / 1e9):
+                    return False
+            elif self.stop_event.is_set():
+                return False
+
+    def run(self, events, dispatch, start_ns=None, speed=1.0, max_gap=0):
+        """Dispatch (action, data) for every event on schedule.
+
+        Returns the deadline of the last event (to anchor the next loop on),
+        or None if stopped. Lateness stats for the run go to last_stats.
+        """
+        start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        deadline = start_ns
+        lateness = []
+        for action, data, offset in retime(events, speed, max_gap):
+            deadline = start_ns + round(offset * 1e9)
+            if not self.wait_until(deadline):
+                self.last_stats = jitter_stats(lateness)
+                return None
+            lateness.append(time.perf_counter_ns() - deadline)
+            dispatch(action, data)
+        self.last_stats = jitter_stats(lateness)
+        return deadline
+
+def retime(events, speed=1.0, max_gap=0):
+    """Yield (action, data, offset) with offsets from the first event in playback seconds.
+
+    Gaps longer than max_gap seconds (0 = no cap) are cut to max_gap, then
+    everything is divided by speed.
+    """
+    offset = 0.0
+    prev_time = None
+    for action, data, event_time in events:
+        if prev_time is not None:
+            gap = event_time - prev_time
+            if max_gap and gap > max_gap:
+                gap = max_gap
+            offset += gap / speed
+        prev_time = event_time
+        yield action, data, offset
+
+def jitter_stats(lateness_ns):
+    """Summarize how late events fired, in microseconds."""
+    if not lateness_ns:
+        return {"events": 0}
+    ordered = sorted(lateness_ns)
+    count = len(ordered)
+    return {
+        "events": count,
+        "mean_us": round(sum(ordered) / count / 1000, 1),
+        "p50_us": round(ordered[count // 2] / 1000, 1),
+        "p99_us": round(ordered[min(count - 1, count * 99 // 100)] / 1000, 1),
+        "max_us": round(ordered[-1] / 1000, 1),
+    }
@@ -0,0 +1,325 @@
+"""Binary .seq files for recorded sequences.
+
+Layout (all little-endian):
+    header        magic "AISQ", version u16, flags u16, string count u32,
+                  record count u32, duration in microseconds u64
+    string table  per entry: length u16 + UTF-8 name ("key:shift_l", "kc:65:a", "button:left", ...)
+    records       16 bytes each: type u8, pad, code u16 (string index), delta-time us u32, x i32, y i32
+
+The header and string table are never compressed, so the library can read a
+file's stats without touching the records. Records may be zlib or zstd
+compressed (flags); uncompressed files are memory-mapped by SequenceView.
+"""
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+from pynput.keyboard import Key, KeyCode
+from pynput.mouse import Button
+from modules.atomic_file import atomic_write
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"AISQ"
+# 2: KeyCodes with a virtual key code are stored as "kc:<vk>:<char>"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIQ")
+RECORD = struct.Struct("<BxHIii")
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+# Compression used when saving: "none" keeps files mappable, "zlib"/"zstd" make them smaller
+SEQ_COMPRESSION = "none"
+
+MOVE, CLICK, KEY_PRESS, KEY_RELEASE = 1, 2, 3, 4
+ACTION_CODES = {"move": MOVE, "click": CLICK, "key_press": KEY_PRESS, "key_release": KEY_RELEASE}
+ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+MAX_DELTA_US = 2**32 - 1
+READ_CHUNK = 64 * 1024
+
+class SequenceFormatError(Exception):
+    """The file is not a sequence this version can read."""
+
+def key_to_name(key):
+    if isinstance(key, Key):
+        return f"key:{key.name}"
+    if isinstance(key, Button):
+        return f"button:{key.name}"
+    char = getattr(key, "char", None)
+    vk = getattr(key, "vk", None)
+    if vk is not None:
+        # keep the vk: with ctrl held Windows reports a control character as char
+        return f"kc:{vk}:{char or ''}"
+    if char:
+        return f"char:{char}"
+    raise ValueError(f"Cannot encode key {key!r}")
+
+def name_to_key(name):
+    kind, _, value = name.partition(":")
+    if kind == "key":
+        return Key[value]
+    if kind == "button":
+        return Button[value]
+    if kind == "char":
+        return KeyCode.from_char(value)
+    if kind == "kc":
+        vk, _, char = value.partition(":")
+        return KeyCode.from_vk(int(vk), char=char or None)
+    if kind == "vk":
+        return KeyCode.from_vk(int(value))
+    raise SequenceFormatError(f"Unknown key name {name!r}")
+
+def encode_events(events):
+    """Return (string table, packed records, duration_us) for (action, data, time) events."""
+    strings = []
+    string_index = {}
+    records = bytearray()
+    prev_time = None
+    elapsed_us = 0
+
+    def code_for(key):
+        name = key_to_name(key)
+        if name not in string_index:
+            string_index[name] = len(strings)
+            strings.append(name)
+        return string_index[name]
+
+    for action, data, event_time in events:
+        delta_us = 0 if prev_time is None else round((event_time - prev_time) * 1_000_000)
+        delta_us = min(max(delta_us, 0), MAX_DELTA_US)
+        prev_time = event_time
+        elapsed_us += delta_us
+        if action == "move":
+            x, y = data
+            records += RECORD.pack(MOVE, 0, delta_us, int(x), int(y))
+        elif action == "click":
+            x, y, button = data
+            records += RECORD.pack(CLICK, code_for(button), delta_us, int(x), int(y))
+        else:
+            records += RECORD.pack(ACTION_CODES[action], code_for(data), delta_us, 0, 0)
+    return strings, bytes(records), elapsed_us
+
+def write_sequence(path, events, compression=SEQ_COMPRESSION):
+    """Write events to path atomically."""
+    flag = COMPRESSIONS[compression]
+    strings, records, duration_us = encode_events(events)
+    record_count = len(records) // RECORD.size
+    if flag == COMPRESSION_ZLIB:
+        records = zlib.compress(records, 6)
+    elif flag == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise SequenceFormatError("zstd compression needs the zstandard package")
+        records = zstandard.ZstdCompressor().compress(records)
+
+    parts = [HEADER.pack(MAGIC, VERSION, flag, len(strings), record_count, duration_us)]
+    for name in strings:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack("<H", len(encoded)))
+        parts.append(encoded)
+    parts.append(records)
+    atomic_write(path, b"".join(parts))
+
+def read_header(f):
+    """Read the header and string table; returns (header dict, key table)."""
+    raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise SequenceFormatError("File too short")
+    magic, version, flags, string_count, record_count, duration_us = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise SequenceFormatError("Not a binary sequence file")
+    if version > VERSION:
+        raise SequenceFormatError(f"Sequence version {version} is newer than this app")
+    keys = []
+    for _ in range(string_count):
+        (length,) = struct.unpack("<H", f.read(2))
+        keys.append(name_to_key(f.read(length).decode("utf-8")))
+    header = {
+        "version": version,
+        "compression": flags & 0x3,
+        "events": record_count,
+        "duration": duration_us / 1_000_000,
+        "records_offset": f.tell(),
+    }
+    return header, keys
+
+def decode_record(raw, offset, keys):
+    """Unpack one record into (action, data, delta seconds)."""
+    kind, code, delta_us, x, y = RECORD.unpack_from(raw, offset)
+    if kind == MOVE:
+        data = (x, y)
+    elif kind == CLICK:
+        data = (x, y, keys[code])
+    else:
+        data = keys[code]
+    return ACTIONS[kind], data, delta_us / 1_000_000
+
+def _record_chunks(f, compression):
+    if compression == COMPRESSION_NONE:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+    elif compression == COMPRESSION_ZLIB:
+        decompressor = zlib.decompressobj()
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                yield decompressor.flush()
+                return
+            yield decompressor.decompress(chunk)
+    elif compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise SequenceFormatError("This sequence needs the zstandard package")
+        reader = zstandard.ZstdDecompressor().stream_reader(f)
+        while True:
+            chunk = reader.read(READ_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        raise SequenceFormatError(f"Unknown compression {compression}")
+
+def iter_sequence(path):
+    """Stream (action, data, time) events from a binary sequence, time starting at 0."""
+    with open(path, "rb") as f:
+        header, keys = read_header(f)
+        pending = b""
+        elapsed = 0.0
+        for chunk in _record_chunks(f, header["compression"]):
+            pending += chunk
+            usable = len(pending) - len(pending) % RECORD.size
+            for offset in range(0, usable, RECORD.size):
+                action, data, delta = decode_record(pending, offset, keys)
+                elapsed += delta
+                yield action, data, elapsed
+            pending = pending[usable:]
+
+class SequenceView:
+    """Memory-mapped, read-only view of an uncompressed sequence.
+
+    Nothing is decoded up front: iterating decodes one record at a time
+    straight from the mapping, so opening is instant and memory stays flat
+    however long the recording is. Times are rebuilt from the deltas while
+    iterating; indexing is O(index) and meant for the first few events.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header, self._keys = read_header(f)
+            if header["compression"] != COMPRESSION_NONE:
+                raise SequenceFormatError("Compressed sequences cannot be memory-mapped")
+            # the mapping keeps its own handle, so the file object can close here
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = header["events"]
+        self.duration = header["duration"]
+        start = header["records_offset"]
+        self._records = memoryview(self._mmap)[start:start + self._count * RECORD.size]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        records, keys = self._records, self._keys
+        elapsed = 0.0
+        for offset in range(0, self._count * RECORD.size, RECORD.size):
+            try:
+                action, data, delta = decode_record(records, offset, keys)
+            except ValueError:
+                if self.closed:
+                    return  # closed from another thread mid-playback
+                raise
+            elapsed += delta
+            yield action, data, elapsed
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("sequence index out of range")
+        elapsed = sum(RECORD.unpack_from(self._records, i * RECORD.size)[2] for i in range(index + 1)) / 1_000_000
+        action, data, _ = decode_record(self._records, index * RECORD.size, self._keys)
+        return action, data, elapsed
+
+    @property
+    def closed(self):
+        return self._mmap is None
+
+    def close(self):
+        """Unmap the file; needed before it can be renamed, replaced or deleted on Windows."""
+        if self._mmap is not None:
+            mapped, self._mmap = self._mmap, None
+            self._records.release()
+            mapped.close()
+
+def open_sequence(path):
+    """Open a sequence for playback: mapped if possible, otherwise decoded into a list.
+
+    Legacy pickle files are migrated first.
+    """
+    if not is_binary_sequence(path):
+        migrate_legacy(path)
+    with open(path, "rb") as f:
+        header, _ = read_header(f)
+    if header["compression"] == COMPRESSION_NONE:
+        return SequenceView(path)
+    return list(iter_sequence(path))
+
+def is_binary_sequence(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+SAFE_BUILTINS = {"tuple", "list", "dict", "set", "frozenset", "float", "int", "str", "bool"}
+PYNPUT_BACKENDS = ("_base", "_darwin", "_uinput", "_win32", "_xorg")
+# Exact (module, name) globals an old recording may reference
+SAFE_GLOBALS = (
+    {("builtins", name) for name in SAFE_BUILTINS}
+    | {(f"pynput.keyboard.{backend}", name) for backend in PYNPUT_BACKENDS for name in ("Key", "KeyCode")}
+    | {(f"pynput.mouse.{backend}", "Button") for backend in PYNPUT_BACKENDS}
+)
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Only rebuild what old recordings contain: builtins and pynput key/button types."""
+
+    def find_class(self, module, name):
+        if "." not in name and (module, name) in SAFE_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a sequence file")
+
+# Held while migrating, so two loads of the same legacy file convert it once
+_migrate_lock = threading.Lock()
+
+def migrate_legacy(path):
+    """Convert a pickled event list to the binary format.
+
+    The converted file is read back before it takes the original's place,
+    and the pickle is kept next to it as path + ".bak".
+    """
+    with _migrate_lock:
+        if is_binary_sequence(path):
+            return  # another load migrated it first
+        with open(path, "rb") as f:
+            events = _LegacyUnpickler(f).load()
+        converted_path = path + ".migrating"
+        try:
+            write_sequence(converted_path, events)
+            actions = [action for action, _, _ in iter_sequence(converted_path)]
+            if actions != [event[0] for event in events]:
+                raise SequenceFormatError(f"Converted copy of {path} does not match the original")
+            os.replace(path, path + ".bak")
+            os.replace(converted_path, path)
+        except BaseException:
+            if os.path.exists(converted_path):
+                os.remove(converted_path)
+            raise
+    print(f"Migrated legacy sequence {path} (original kept as {path}.bak)")
@@ -0,0 +1,105 @@
+import json
+import os
+
+from modules.atomic_file import atomic_write
+from modules.sequence_file import SequenceFormatError, is_binary_sequence, read_header
+
+# Index of the sequences directory, kept next to the .seq files
+LIBRARY_FILE = "library.json"
+
+class SequenceLibrary:
+    """Name, size, event count, duration and mtime of every saved sequence.
+
+    The stats are cached in LIBRARY_FILE, so a scan only stats each file and
+    reads the header of the ones whose size or mtime changed. Save, rename
+    and delete update single entries instead of rescanning.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, LIBRARY_FILE)
+        self.entries = {}
+        self._names = []
+
+    def names(self):
+        """Sequence file names, sorted."""
+        return self._names
+
+    def get(self, filename):
+        return self.entries.get(filename)
+
+    def scan(self):
+        """Bring the index up to date with the directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        cached = self._load()
+        entries = {}
+        changed = False
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".seq") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                old = cached.get(entry.name)
+                if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+                    entries[entry.name] = old
+                else:
+                    entries[entry.name] = self._read_entry(entry.path, st)
+                    changed = True
+        if changed or entries.keys() != cached.keys():
+            self.entries = entries
+            self._save()
+        self.entries = entries
+        self._names = sorted(entries)
+
+    def update(self, filename):
+        """Re-read one sequence after it was written."""
+        path = os.path.join(self.directory, filename)
+        try:
+            self.entries[filename] = self._read_entry(path, os.stat(path))
+        except OSError:
+            return self.remove(filename)
+        if filename not in self._names:
+            self._names = sorted(self.entries)
+        self._save()
+
+    def remove(self, filename):
+        if self.entries.pop(filename, None) is not None:
+            self._names.remove(filename)
+            self._save()
+
+    def rename(self, old_name, new_name):
+        entry = self.entries.pop(old_name, None)
+        if entry is None:
+            return self.update(new_name)
+        self.entries[new_name] = entry
+        self._names = sorted(self.entries)
+        self._save()
+
+    @staticmethod
+    def _read_entry(path, st):
+        entry = {"size": st.st_size, "mtime": st.st_mtime, "events": None, "duration": None}
+        try:
+            if is_binary_sequence(path):
+                with open(path, "rb") as f:
+                    header, _ = read_header(f)
+                entry["events"] = header["events"]
+                entry["duration"] = round(header["duration"], 3)
+        except (OSError, SequenceFormatError, ValueError) as e:
+            print(f"Cannot read sequence header {path}: {e}")
+        return entry
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Rebuilding {LIBRARY_FILE}: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            atomic_write(self.path, json.dumps(self.entries))
+        except OSError as e:
+            print(f"Error saving {LIBRARY_FILE}: {e}")
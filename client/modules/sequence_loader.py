@@ -0,0 +1,123 @@
+import os
+import threading
+from collections import OrderedDict
+
+from modules.event_buffer import EventBuffer
+from modules.sequence_file import (
+    COMPRESSION_NONE, SequenceView, is_binary_sequence, iter_sequence, migrate_legacy, read_header,
+)
+
+# Recently used sequences kept ready to play
+SEQUENCE_CACHE_SIZE = 4
+# Events decoded between progress reports and cancel checks
+PROGRESS_EVERY = 50_000
+
+class LoadCancelled(Exception):
+    """The load was cancelled before it finished."""
+
+def load_events(path, progress=None, cancelled=None):
+    """Open path for playback: a SequenceView if it can be mapped, else decoded into an EventBuffer.
+
+    progress(fraction) is called as compressed records are decoded; setting
+    the cancelled event makes the load raise LoadCancelled.
+    """
+    if not is_binary_sequence(path):
+        migrate_legacy(path)
+    with open(path, "rb") as f:
+        header, _ = read_header(f)
+    if header["compression"] == COMPRESSION_NONE:
+        return SequenceView(path)
+    total = max(header["events"], 1)
+    buffer = EventBuffer()
+    for count, event in enumerate(iter_sequence(path), 1):
+        buffer.append(event)
+        if count % PROGRESS_EVERY == 0:
+            if cancelled is not None and cancelled.is_set():
+                raise LoadCancelled(path)
+            if progress:
+                progress(count / total)
+    return buffer
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+class SequenceCache:
+    """LRU of loaded sequences by path; an entry is dropped once its file changes."""
+
+    def __init__(self, size=SEQUENCE_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            try:
+                fresh = entry[0] == _file_stamp(path)
+            except OSError:
+                fresh = False
+            if not fresh:
+                del self._entries[path]
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def put(self, path, sequence):
+        path = os.path.abspath(path)
+        try:
+            stamp = _file_stamp(path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[path] = (stamp, sequence)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)  # mapped views unmap once nothing else holds them
+
+    def discard(self, path):
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+class SequenceLoad:
+    """Loads one sequence on a worker thread, through the cache.
+
+    on_progress(fraction) and on_done(load) run on the worker thread;
+    after on_done, exactly one of result/error is set, or cancelled is.
+    """
+
+    def __init__(self, path, cache, on_done, on_progress=None):
+        self.path = path
+        self.cache = cache
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        try:
+            sequence = self.cache.get(self.path)
+            if sequence is None:
+                sequence = load_events(self.path, self.on_progress, self._cancel)
+                self.cache.put(self.path, sequence)
+            self.result = sequence
+        except LoadCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        self.on_done(self)
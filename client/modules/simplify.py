@@ -0,0 +1,97 @@
+"""Thin out recorded mouse moves.
+
+Only runs of consecutive moves are touched: the first and last move of a
+run always survive, so the cursor is where it was recorded whenever a
+click or key event replays. Kept events keep their original times.
+"""
+import math
+
+class MoveFilter:
+    """Live decimation for the recorder: drop moves closer than min_interval
+    seconds or min_distance pixels to the last kept one.
+
+    The latest dropped move is held back; call take_pending() before
+    recording any other event so the run still ends on the real position.
+    """
+
+    def __init__(self, min_interval=0.0, min_distance=0):
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self._last = None
+        self._pending = None
+
+    @property
+    def enabled(self):
+        return self.min_interval > 0 or self.min_distance > 0
+
+    def accept(self, x, y, event_time):
+        if self._last is not None:
+            last_x, last_y, last_time = self._last
+            if (event_time - last_time < self.min_interval
+                    or math.hypot(x - last_x, y - last_y) < self.min_distance):
+                self._pending = (x, y, event_time)
+                return False
+        self._last = (x, y, event_time)
+        self._pending = None
+        return True
+
+    def take_pending(self):
+        """Return the held-back move, if any, and end the current run."""
+        pending, self._pending, self._last = self._pending, None, None
+        return pending
+
+def _distance_to_segment(point, start, end):
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def rdp_indices(points, epsilon):
+    """Indices of the points kept by Ramer-Douglas-Peucker with tolerance epsilon (pixels)."""
+    if len(points) < 3:
+        return list(range(len(points)))
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]  # iterative, so long drifts cannot hit the recursion limit
+    while stack:
+        first, last = stack.pop()
+        best, best_dist = None, epsilon
+        for i in range(first + 1, last):
+            dist = _distance_to_segment(points[i], points[first], points[last])
+            if dist > best_dist:
+                best, best_dist = i, dist
+        if best is not None:
+            keep[best] = True
+            stack.append((first, best))
+            stack.append((best, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+def _simplify_run(run, epsilon, min_interval, min_distance):
+    if min_interval > 0 or min_distance > 0:
+        move_filter = MoveFilter(min_interval, min_distance)
+        thinned = [e for e in run if move_filter.accept(e[1][0], e[1][1], e[2])]
+        if thinned[-1] is not run[-1]:
+            thinned.append(run[-1])
+        run = thinned
+    if epsilon > 0:
+        run = [run[i] for i in rdp_indices([e[1] for e in run], epsilon)]
+    return run
+
+def simplify_events(events, epsilon=0, min_interval=0.0, min_distance=0):
+    """Return a list of events with each run of moves decimated and/or RDP-simplified."""
+    result = []
+    run = []
+    for event in events:
+        if event[0] == "move":
+            run.append(event)
+            continue
+        if run:
+            result.extend(_simplify_run(run, epsilon, min_interval, min_distance))
+            run = []
+        result.append(event)
+    if run:
+        result.extend(_simplify_run(run, epsilon, min_interval, min_distance))
+    return result
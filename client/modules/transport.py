@@ -0,0 +1,114 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Licensing server; override with ANTI_IDLE_SERVER for staging or on-prem servers
+SERVER_URL = os.getenv("ANTI_IDLE_SERVER", "http://127.0.0.1:8000")
+# Seconds before a request gives up
+REQUEST_TIMEOUT = 5
+# Extra attempts after a connection error, and the base delay between them (jittered, doubled)
+RETRIES = 2
+RETRY_BACKOFF = 0.25
+# Failed calls in a row before we stop trying, and how long we stop for (seconds)
+CIRCUIT_FAILURES = 3
+CIRCUIT_RESET = 30
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The server failed recently, so the request was not attempted."""
+
+class LicenseTransport:
+    """Keep-alive HTTP session to the licensing server with retries and a circuit breaker.
+
+    Raises the usual requests exceptions, so callers keep their existing
+    error handling; CircuitOpenError is a ConnectionError.
+    """
+
+    def __init__(self, base_url=SERVER_URL, retries=RETRIES, backoff=RETRY_BACKOFF,
+                 circuit_failures=CIRCUIT_FAILURES, circuit_reset=CIRCUIT_RESET):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.circuit_failures = circuit_failures
+        self.circuit_reset = circuit_reset
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._stats = {}
+
+    def post(self, endpoint, payload, timeout=REQUEST_TIMEOUT):
+        self._check_circuit(endpoint)
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(self.base_url + endpoint, json=payload, timeout=timeout)
+            except requests.exceptions.ConnectionError:
+                self._record(endpoint, start, error=True)
+                if attempt == self.retries:
+                    self._failed()
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            except requests.exceptions.RequestException:
+                self._record(endpoint, start, error=True)
+                self._failed()
+                raise
+            self._record(endpoint, start, error=response.status_code >= 500)
+            if response.status_code >= 500:
+                self._failed()
+            else:
+                self._succeeded()
+            return response
+
+    def latency_stats(self):
+        """Per-endpoint request count, errors and average/max latency in milliseconds."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 1),
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for endpoint, s in self._stats.items()
+            }
+
+    def _check_circuit(self, endpoint):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.circuit_reset:
+                raise CircuitOpenError(f"server unavailable, not calling {endpoint}")
+            # half-open: let this request through to probe the server
+            self._opened_at = None
+            self._failures = self.circuit_failures - 1
+
+    def _failed(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.circuit_failures and self._opened_at is None:
+                print(f"❌ Server unreachable, skipping requests for {self.circuit_reset}s")
+                self._opened_at = time.monotonic()
+
+    def _succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def _record(self, endpoint, start, error):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            s = self._stats.setdefault(endpoint, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["errors"] += int(error)
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+
+transport = LicenseTransport()
@@ -0,0 +1,239 @@
+import asyncio
+import base64
+import os
+import sqlite3
+import threading
+
+import httpx
+
+class DatabaseError(Exception):
+    """Raised when a pipeline could not be sent or its response could not be read."""
+
+class HttpBackend:
+    """Sends Hrana pipeline payloads to a remote libSQL server over a pooled keep-alive client."""
+
+    def __init__(self, url, token, timeout=10, max_connections=100, max_keepalive=20, keepalive_expiry=30):
+        self.url = url
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.client = None
+
+    async def open(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=self.limits)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def pipeline(self, payload, timeout=None):
+        if self.client is None:
+            await self.open()
+        try:
+            response = await self.client.post(self.url, json=payload, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise DatabaseError(f"request failed: {e}") from e
+        except ValueError as e:
+            raise DatabaseError(f"invalid JSON response: {response.text}") from e
+
+# Schema from app_logic.txt, created on first open of a local database
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hardware_id TEXT UNIQUE NOT NULL,
+    registered_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_server_con DATETIME NULL
+);
+CREATE TABLE IF NOT EXISTS licenses (
+    license_key TEXT PRIMARY KEY,
+    hardware_id TEXT UNIQUE NULL,
+    is_active BOOLEAN DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NULL,
+    date_used DATETIME NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    contact_number TEXT NULL,
+    hardware_id TEXT UNIQUE NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+def _from_hrana(arg):
+    kind = arg.get("type")
+    if kind == "null":
+        return None
+    if kind == "integer":
+        return int(arg["value"])
+    if kind == "float":
+        return float(arg["value"])
+    if kind == "blob":
+        return base64.b64decode(arg["base64"])
+    return arg.get("value")
+
+def _to_hrana(value):
+    # libSQL sends integers as strings to keep 64-bit precision in JSON
+    if value is None:
+        return {"type": "null"}
+    if isinstance(value, int):
+        return {"type": "integer", "value": str(value)}
+    if isinstance(value, float):
+        return {"type": "float", "value": value}
+    if isinstance(value, bytes):
+        return {"type": "blob", "base64": base64.b64encode(value).decode()}
+    return {"type": "text", "value": value}
+
+class SqliteBackend:
+    """Runs Hrana pipeline payloads against an embedded SQLite file.
+
+    Each worker thread keeps its own connection in WAL mode, and sqlite3's
+    statement cache keeps the handful of queries db_utils sends prepared.
+    """
+
+    def __init__(self, path, timeout=10, cached_statements=256):
+        self.path = path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,  # autocommit, like each libSQL pipeline statement
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    async def open(self):
+        def create_schema():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection().executescript(SQLITE_SCHEMA)
+        try:
+            await asyncio.to_thread(create_schema)
+        except sqlite3.Error as e:
+            raise DatabaseError(f"cannot open {self.path}: {e}") from e
+
+    async def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    async def pipeline(self, payload, timeout=None):
+        try:
+            return await asyncio.to_thread(self._run, payload)
+        except sqlite3.Error as e:
+            raise DatabaseError(f"sqlite error: {e}") from e
+
+    def _run(self, payload):
+        conn = self._connection()
+        results = []
+        for request in payload.get("requests", []):
+            if request.get("type") == "execute":
+                result, error = self._execute(conn, request["stmt"])
+                if error is not None:
+                    results.append({"type": "error", "error": error})
+                else:
+                    results.append({"type": "ok", "response": {"type": "execute", "result": result}})
+            elif request.get("type") == "batch":
+                results.append({"type": "ok", "response": {"type": "batch", "result": self._batch(conn, request["batch"])}})
+            else:
+                results.append({"type": "ok", "response": {"type": request.get("type")}})
+        return {"results": results}
+
+    @staticmethod
+    def _execute(conn, stmt):
+        """Run one statement; returns (Hrana result, None) or (None, Hrana error)."""
+        try:
+            cursor = conn.execute(stmt["sql"], [_from_hrana(a) for a in stmt.get("args", [])])
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            return None, {"message": str(e)}
+        return {
+            "cols": [{"name": col[0]} for col in cursor.description or []],
+            "rows": [[_to_hrana(value) for value in row] for row in rows],
+            "affected_row_count": max(cursor.rowcount, 0),
+            "last_insert_rowid": str(cursor.lastrowid) if cursor.lastrowid else None,
+        }, None
+
+    def _batch(self, conn, batch):
+        """Run Hrana batch steps, skipping those whose condition is not met, like libSQL does."""
+        step_results = []
+        step_errors = []
+
+        def holds(cond):
+            kind = cond["type"]
+            if kind == "ok":
+                return step_results[cond["step"]] is not None
+            if kind == "error":
+                return step_errors[cond["step"]] is not None
+            if kind == "not":
+                return not holds(cond["cond"])
+            if kind == "and":
+                return all(holds(c) for c in cond["conds"])
+            if kind == "or":
+                return any(holds(c) for c in cond["conds"])
+            if kind == "is_autocommit":
+                return not conn.in_transaction
+            raise ValueError(f"unknown batch condition {kind!r}")
+
+        for step in batch.get("steps", []):
+            if step.get("condition") is not None and not holds(step["condition"]):
+                result, error = None, None
+            else:
+                result, error = self._execute(conn, step["stmt"])
+            step_results.append(result)
+            step_errors.append(error)
+        if conn.in_transaction:
+            conn.rollback()  # never leave a half-finished transaction on this thread's connection
+        return {"step_results": step_results, "step_errors": step_errors}
+
+def create_backend():
+    """Pick the storage backend from DB_BACKEND ("http" or "sqlite")."""
+    kind = os.getenv("DB_BACKEND", "http").lower()
+    timeout = float(os.getenv("DB_TIMEOUT", "10"))
+    if kind == "sqlite":
+        return SqliteBackend(os.getenv("SQLITE_PATH", "anti_idle.db"), timeout=timeout)
+    if kind != "http":
+        raise RuntimeError(f"❌ Unknown DB_BACKEND: {kind}")
+
+    db_url = os.getenv("DB_URL")
+    token = os.getenv("TBL_TOKEN_KEY")
+    if not token or not db_url:
+        raise RuntimeError("❌ Missing environment variables: TBL_TOKEN_KEY or DB_URL")
+    return HttpBackend(
+        db_url,
+        token,
+        timeout=timeout,
+        max_connections=int(os.getenv("DB_POOL_MAX_CONNECTIONS", "100")),
+        max_keepalive=int(os.getenv("DB_POOL_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("DB_KEEPALIVE_EXPIRY", "30")),
+    )
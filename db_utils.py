@@ -1,85 +1,138 @@
 from dotenv import load_dotenv
 import os
-import requests
 import json
 from fastapi import HTTPException, Request
 from pydantic import BaseModel
 import ast
 import re
+import time
+import asyncio
+from typing import Optional
+from collections import OrderedDict
+from db_backends import DatabaseError, create_backend
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
 # Load environment variables
 load_dotenv()
-DB_URL = os.getenv("DB_URL")
-TBL_TOKEN_KEY = os.getenv("TBL_TOKEN_KEY")
 
-if not TBL_TOKEN_KEY or not DB_URL:
-    raise RuntimeError("❌ Missing environment variables: TBL_TOKEN_KEY or DB_URL")
+# Storage backend: remote libSQL over HTTP or an embedded SQLite file (see db_backends.py)
+db_backend = create_backend()
+
+async def open_db():
+    await db_backend.open()
+
+async def close_db():
+    await db_backend.close()
+
+async def db_execute(payload, timeout=None):
+    """Run a Hrana pipeline payload on the configured backend and return its JSON response."""
+    return await db_backend.pipeline(payload, timeout=timeout)
+
+# License cache settings
+LICENSE_CACHE_SIZE = int(os.getenv("LICENSE_CACHE_SIZE", "10000"))
+LICENSE_CACHE_TTL = float(os.getenv("LICENSE_CACHE_TTL", "300"))
+
+class LicenseCache:
+    """Bounded LRU cache of license rows with a TTL, looked up by license_key or hardware_id."""
+
+    def __init__(self, maxsize=LICENSE_CACHE_SIZE, ttl=LICENSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._rows = OrderedDict()  # license_key -> (expires_at, row)
+        self._by_hw = {}  # hardware_id -> license_key
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._rows.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, row = entry
+        if expires_at < time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._rows.move_to_end(key)
+        self.hits += 1
+        return row
+
+    def get_by_hw(self, hw_id):
+        key = self._by_hw.get(hw_id)
+        if key is None:
+            self.misses += 1
+            return None
+        return self.get(key)
+
+    def put(self, row):
+        key = row['license_key']
+        self._drop(key)
+        self._rows[key] = (time.monotonic() + self.ttl, row)
+        if row.get('hardware_id'):
+            self._by_hw[row['hardware_id']] = key
+        while len(self._rows) > self.maxsize:
+            oldest = next(iter(self._rows))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._drop(key)
+
+    def invalidate_hw(self, hw_id):
+        key = self._by_hw.get(hw_id)
+        if key is not None:
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self._rows.pop(key, None)
+        if entry is not None:
+            hw_id = entry[1].get('hardware_id')
+            if hw_id and self._by_hw.get(hw_id) == key:
+                del self._by_hw[hw_id]
+
+    def stats(self):
+        return {
+            "size": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
 
-headers = {
-    "Authorization": f"Bearer {TBL_TOKEN_KEY}",
-    "Content-Type": "application/json"
-}
+license_cache = LicenseCache()
 
-# class Key_Id(BaseModel):
-#     key : str
-#     hw_id : str
+class SingleFlight:
+    """Let concurrent callers asking the same question share one in-flight DB call."""
 
-def find_key_id(key: str, hw_id: str):
-    # hw_id = request.hw_id
-    # key = request.key
-    print(f'find_id: {hw_id}')
-    print(f'find_key: {key}')
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
 
-    payload = {
-            "requests": [
-                {
-                    "type": "execute",
-                    "stmt": {
-                        "sql": "SELECT * FROM licenses WHERE license_key = ? AND hardware_id = ?",
-                        "args": [{"type": "text", "value":key},
-                                {"type": "text", "value":hw_id}]
-                    }
-                }
-            ]
-        }
-    try:
-        response = requests.post(DB_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        try:
-            data = response.json()
-            # print(data)
-            results = data.get("results", [])
+    async def do(self, key, func, *args):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # shield so one cancelled caller does not cancel the call for everyone else
+        return await asyncio.shield(task)
 
-            if not results or results[0].get("type") != "ok":
-                raise HTTPException(status_code=500, detail="Database error")
+    def stats(self):
+        return {"in_flight": len(self._inflight), "calls": self.calls, "shared": self.shared}
 
-            select_result = results[0]["response"]["result"]
-
-            cols = [col["name"] for col in select_result["cols"]]
-            rows = select_result.get("rows", [])
-
-            if not rows:
-                print({'status': "trial", 'key': 'None'})
-                return {'status': "trial", 'key': 'None'}
-                    
-            # extract the first row
-            row = rows[0]
-            info = {cols[i]: cell.get("value") for i, cell in enumerate(row)}
-            if info['license_key'] == key and info['hardware_id'] == hw_id:
-                print({'status': "licensed", 'key': info['license_key']})
-                return {'status': "licensed", 'key': info['license_key']}
-            
-        except ValueError:
-            print(f"❌ Invalid JSON response: {response.text}")
-            raise HTTPException(status_code=500, detail="Invalid database response")
+single_flight = SingleFlight()
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Database request failed: {e}")
-        print(f"Response body: {response.text}")
-        raise HTTPException(status_code=500, detail="Database request failed")
+async def check_license(key: str): # finds license_key if it exist
+    return await single_flight.do(("license", key), _check_license, key)
 
-def check_license(key:str): # finds license_key if it exist
+async def _check_license(key: str):
     print(f'chec license: {key}')
+    if license_cache.get(key):
+        return {'key': "valid"}
     payload = {
             "requests": [
                 {
@@ -92,10 +145,8 @@ def check_license(key:str): # finds license_key if it exist
             ]
         }
     try:
-        response = requests.post(DB_URL, headers=headers, json=payload)
-        response.raise_for_status()
+        data = await db_execute(payload)
         try:
-            data = response.json()
             results = data.get("results", [])
 
             if not results or results[0].get("type") != "ok":
@@ -114,6 +165,7 @@ def check_license(key:str): # finds license_key if it exist
             # extract the first row
             row = rows[0]
             info = {cols[i]: cell.get("value") for i, cell in enumerate(row)}
+            license_cache.put(info)
             if info['license_key'] == key:
                 print({'key': "valid"})
                 return {'key': "valid"}
@@ -121,85 +173,128 @@ def check_license(key:str): # finds license_key if it exist
             # return {rows}
 
         except ValueError:
-            print(f"❌ Invalid JSON response: {response.text}")
+            print(f"❌ Invalid database response: {data}")
             raise HTTPException(status_code=500, detail="Invalid database response")
 
-    except requests.exceptions.RequestException as e:
+    except DatabaseError as e:
         print(f"❌ Database request failed: {e}")
-        print(f"Response body: {response.text}")
         raise HTTPException(status_code=500, detail="Database request failed")
 class ValidationRequest(BaseModel):
     key: str
     hw_id: str
     date: str
 
-def validate_key(key: str, hw_id: str, date: str):
-    print(f"validate_key: key={key}")
+def _text(value):
+    return {"type": "text", "value": value}
+
+def _stmt(sql: str, *args):
+    return {"type": "execute", "stmt": {"sql": sql, "args": [_text(a) for a in args]}}
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+def _rows(result):
+    """Turn one pipeline result into a list of {column: value} dicts."""
+    select_result = result["response"]["result"]
+    cols = [col["name"] for col in select_result["cols"]]
+    return [{cols[i]: cell.get("value") for i, cell in enumerate(row)} for row in select_result.get("rows", [])]
+
+async def db_pipeline(statements):
+    """Run statements as one pipeline and return their results, all of which must be ok."""
+    try:
+        results = (await db_execute({"requests": statements})).get("results", [])
+    except DatabaseError as e:
+        print(f"❌ Database request failed: {e}")
+        raise HTTPException(status_code=500, detail="Database request failed")
+    if len(results) != len(statements) or any(r.get("type") != "ok" for r in results):
+        print(f"🚫 Pipeline failed: {[r.get('error') for r in results if r.get('type') != 'ok']}")
+        raise HTTPException(status_code=500, detail="Database error")
+    return results
+
+async def db_transaction(statements):
+    """Run statements atomically and return their results; any failure rolls all of them back.
+
+    Sent as one Hrana batch: BEGIN, each statement only if the previous one
+    succeeded, COMMIT only if the last one did, and ROLLBACK otherwise.
+    """
+    steps = [{"stmt": {"sql": "BEGIN IMMEDIATE"}}]
+    for stmt in statements:
+        steps.append({"stmt": stmt["stmt"], "condition": {"type": "ok", "step": len(steps) - 1}})
+    commit = len(steps)
+    steps.append({"stmt": {"sql": "COMMIT"}, "condition": {"type": "ok", "step": commit - 1}})
+    steps.append({"stmt": {"sql": "ROLLBACK"}, "condition": {"type": "not", "cond": {"type": "ok", "step": commit}}})
+    results = await db_pipeline([{"type": "batch", "batch": {"steps": steps}}])
+    batch = results[0]["response"]["result"]
+    if batch["step_results"][commit] is None:
+        print(f"🚫 Transaction rolled back: {[e for e in batch['step_errors'] if e]}")
+        raise HTTPException(status_code=500, detail="Database error")
+    return [{"type": "ok", "response": {"type": "execute", "result": r}} for r in batch["step_results"][1:commit]]
+
+async def validate_license(key: str, hw_id: str, date: str):
+    """Check, bind and confirm a license in a single pipelined round trip.
+
+    The UPDATE only binds when the key is still unbound and the hardware_id is
+    not used by another license, so the trailing SELECT tells us the outcome.
+    """
+    print(f"validate_license: key={key}")
+    cached = license_cache.get_by_hw(hw_id)
+    if cached and cached['license_key'] == key:
+        return {'status': 'licensed', 'key': key}
+
     payload = {
         "requests": [
-            {"type": "execute", "stmt": {"sql": "SELECT * FROM licenses WHERE license_key = ?", "args": [{"type": "text", "value": key}]}},
-            {"type": "execute", "stmt": {"sql": "SELECT * FROM licenses WHERE hardware_id = ?", "args": [{"type": "text", "value": hw_id}]}}
+            _stmt("SELECT * FROM licenses WHERE license_key = ?", key),
+            _stmt("SELECT license_key FROM licenses WHERE hardware_id = ?", hw_id),
+            _stmt("""
+                UPDATE licenses SET hardware_id = ?, is_active = 1, date_used = ?
+                WHERE license_key = ? AND hardware_id IS NULL
+                AND NOT EXISTS (SELECT 1 FROM licenses WHERE hardware_id = ?)
+            """, hw_id, date, key, hw_id),
+            _stmt("SELECT * FROM licenses WHERE license_key = ? AND hardware_id = ?", key, hw_id),
         ]
     }
     try:
-        response = requests.post(DB_URL, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
-        if not results or results[0].get("type") != "ok":
-            print(f"validate_key: SELECT key failed: {results}")
-            raise HTTPException(status_code=404, detail="Invalid key")
-        
-        # Check license key
-        select_result = results[0]["response"]["result"]
-        rows = select_result.get("rows", [])
-        if not rows:
-            print({'status': 'trial', 'key': 'None'})
-            return {'status': 'trial', 'key': 'None'}
-        cols = [col["name"] for col in select_result["cols"]]
-        info = {cols[i]: cell.get("value") for i, cell in enumerate(rows[0])}
-        print(f"validate_key: License={info}")
-        
-        # Check hardware_id conflict
-        if len(results) > 1 and results[1].get("type") == "ok":
-            hw_result = results[1]["response"]["result"]
-            hw_rows = hw_result.get("rows", [])
-            if hw_rows and hw_rows[0][cols.index("license_key")]["value"] != key:
-                print(f"validate_key: hardware_id={hw_id} already used by another key")
-                raise HTTPException(status_code=400, detail="Hardware ID already bound to another license")
-        
-        if info.get('hardware_id') and info['hardware_id'] != hw_id:
-            print({'status': 'trial', 'key': 'None'})
-            return {'status': 'trial', 'key': 'None'}
-        
-        if info.get('hardware_id') is None:
-            print(f"validate_key: Updating hw_id={hw_id}, date={date}")
-            update_payload = {
-                "requests": [{"type": "execute", "stmt": {
-                    "sql": "UPDATE licenses SET hardware_id = ?, is_active = 1, date_used = ? WHERE license_key = ?",
-                    "args": [{"type": "text", "value": hw_id}, {"type": "text", "value": date}, {"type": "text", "value": key}]
-                }}]
-            }
-            update_response = requests.post(DB_URL, headers=headers, json=update_payload, timeout=10)
-            update_response.raise_for_status()
-            update_data = update_response.json()
-            print(f"validate_key: Update response={update_data}")
-            if not update_data.get("results", []) or update_data["results"][0].get("type") != "ok":
-                error = update_data.get("results", [{}])[0].get("error", "Unknown error")
-                print(f"validate_key: Update failed: {error}")
-                raise HTTPException(status_code=500, detail=f"Update failed: {error}")
-        
-        print({'status': 'licensed', 'key': key})
-        return {'status': 'licensed', 'key': key}
-    except requests.exceptions.RequestException as e:
-        print(f"validate_key error: DB request failed: {e}")
+        results = (await db_execute(payload)).get("results", [])
+        if len(results) < 4 or any(r.get("type") != "ok" for r in results):
+            errors = [r.get("error") for r in results if r.get("type") != "ok"]
+            print(f"validate_license: pipeline failed: {errors}")
+            raise HTTPException(status_code=500, detail="Database error")
+
+        license_rows, hw_rows, _, bound_rows = (_rows(r) for r in results)
+        # the trailing SELECT reflects our UPDATE, so it is the row to cache
+        for row in bound_rows or license_rows:
+            license_cache.put(row)
+        if not license_rows:
+            print({'status': 'invalid'})
+            return {'status': 'invalid'}
+
+        if hw_rows and hw_rows[0]['license_key'] != key:
+            print(f"validate_license: hardware_id={hw_id} already used by another key")
+            raise HTTPException(status_code=400, detail="Hardware ID already bound to another license")
+
+        if bound_rows:
+            print({'status': 'licensed', 'key': key})
+            return {'status': 'licensed', 'key': key}
+
+        if license_rows[0].get('hardware_id') not in (None, hw_id):
+            print({'status': 'invalid'})
+            return {'status': 'invalid'}
+
+        # key was unbound but got claimed between our SELECT and UPDATE
+        print({'status': 'trial', 'key': 'None'})
+        return {'status': 'trial', 'key': 'None'}
+    except DatabaseError as e:
+        print(f"validate_license error: DB request failed: {e}")
         raise HTTPException(status_code=500, detail=f"DB request failed: {e}")
-    except ValueError as e:
-        print(f"validate_key error: Invalid response: {e}")
+    except (ValueError, KeyError) as e:
+        print(f"validate_license error: Invalid response: {e}")
         raise HTTPException(status_code=500, detail=f"Invalid DB response: {e}")
-    
+
 async def check_device_exists(hw_id: str):
     """Check if a device with the given hardware_id exists in the database."""
+    return await single_flight.do(("device", hw_id), _check_device_exists, hw_id)
+
+async def _check_device_exists(hw_id: str):
     payload = {
         "requests": [
             {
@@ -213,10 +308,7 @@ async def check_device_exists(hw_id: str):
     }
 
     try:
-        response = requests.post(DB_URL, headers=headers, json=payload)
-        response.raise_for_status()
-
-        data = response.json()
+        data = await db_execute(payload)
         results = data.get("results", [])
         if not results:
             print("🚫 No response from DB on check.")
@@ -229,23 +321,79 @@ async def check_device_exists(hw_id: str):
             device_data = rows[0]  # [hw_id, registered_at, last_server_con]
             return {
                 "exists": True,
-                "id": device_data[0]['value'],
-                "hardware_id": device_data[1]['value'],
-                "registered_at": device_data[2]['value'],
-                "last_server_con": device_data[3]['value']
+                "id": device_data[0].get('value'),
+                "hardware_id": device_data[1].get('value'),
+                "registered_at": device_data[2].get('value'),
+                "last_server_con": device_data[3].get('value')
             }
         return {"exists": False}
 
-    except requests.exceptions.RequestException as e:
+    except DatabaseError as e:
         print(f"❌ Database request failed in check: {e}")
         raise HTTPException(status_code=500, detail="Database request failed")
     except ValueError:
-        print(f"❌ Invalid JSON response in check: {response.text}")
+        print(f"❌ Invalid database response in check: {data}")
         raise HTTPException(status_code=500, detail="Invalid database response")
+# Hex of the server's 32-byte Ed25519 private key; device rows are signed with it so clients can trust them offline
+CACHE_SIGNING_KEY = os.getenv("CACHE_SIGNING_KEY")
+cache_signer = Ed25519PrivateKey.from_private_bytes(bytes.fromhex(CACHE_SIGNING_KEY)) if CACHE_SIGNING_KEY else None
+if cache_signer is None:
+    print("⚠️ CACHE_SIGNING_KEY not set, clients will not keep an offline license cache")
+
+def device_response(message, device):
+    """Body returned for a device row, with "sig" over the row when CACHE_SIGNING_KEY is set."""
+    body = {"server message": message, "data": device}
+    if cache_signer is not None:
+        canonical = json.dumps(device, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        body["sig"] = cache_signer.sign(canonical).hex()
+    return body
+
 class DeviceRegisterRequest(BaseModel):
     hw_id: str
     date: str  # Registration date
     # server_con: str  # Last server connection
+    legacy_hw_id: Optional[str] = None  # pipe-joined id the device was registered with before
+
+def is_legacy_hw_id(hw_id):
+    """True for the pipe-joined WMI ids devices registered with before fingerprints."""
+    return bool(hw_id) and "|" in hw_id
+
+async def find_moved_device(legacy_hw_id, hw_id):
+    """Find the device still registered under legacy_hw_id, if hw_id is not registered yet.
+
+    Only an exact match on a legacy-format id counts, and a device already
+    on a fingerprint is never moved, so one machine cannot take over
+    another's row.
+    """
+    if not is_legacy_hw_id(legacy_hw_id):
+        return None
+    legacy_result, current_result = await db_pipeline([
+        _stmt("SELECT * FROM devices WHERE hardware_id = ?", legacy_hw_id),
+        _stmt("SELECT id FROM devices WHERE hardware_id = ?", hw_id),
+    ])
+    legacy_rows = _rows(legacy_result)
+    if not legacy_rows or _rows(current_result):
+        return None
+    return legacy_rows[0]
+
+async def rebind_device(request: DeviceRegisterRequest):
+    """Move a device registered under its legacy id (and its license) to the fingerprint it reports now."""
+    device = await find_moved_device(request.legacy_hw_id, request.hw_id)
+    if device is None:
+        return None
+    old_hw_id = device['hardware_id']
+    print(f"rebinding device {device['id']}: {old_hw_id} -> {request.hw_id}")
+    try:
+        results = await db_transaction([
+            _stmt("UPDATE devices SET hardware_id = ? WHERE id = ?", request.hw_id, device['id']),
+            _stmt("UPDATE licenses SET hardware_id = ? WHERE hardware_id = ?", request.hw_id, old_hw_id),
+            _stmt("SELECT * FROM devices WHERE id = ?", device['id']),
+        ])
+    except HTTPException:
+        print(f"rebinding device {device['id']} failed, registering {request.hw_id} as a new device")
+        return None
+    license_cache.invalidate_hw(old_hw_id)
+    return _rows(results[-1])[0]
 
 async def register_device(request: DeviceRegisterRequest):
     hw_id = request.hw_id
@@ -261,10 +409,11 @@ async def register_device(request: DeviceRegisterRequest):
             "registered_at": dev_data["registered_at"],
             "last_server_con": dev_data["last_server_con"],
         }
-        return {
-            "server message": "Device already registered",
-            "data": device_data
-        }
+        return device_response("Device already registered", device_data)
+
+    moved = await rebind_device(request)
+    if moved is not None:
+        return device_response("Device already registered", moved)
 
     payload = {
     "requests": [
@@ -293,11 +442,9 @@ async def register_device(request: DeviceRegisterRequest):
 }
 
     try:
-        response = requests.post(DB_URL, headers=headers, json=payload)
-        response.raise_for_status()
+        data = await db_execute(payload)
 
         try:
-            data = response.json()
             results = data.get("results", [])
             if not results or len(results) < 2:
                 print("🚫 No response from DB.")
@@ -308,21 +455,17 @@ async def register_device(request: DeviceRegisterRequest):
             cols = [col["name"] for col in select_result["cols"]]
             row = select_result["rows"][0]
             device_data = {
-                cols[i]: value["value"] for i, value in enumerate(row)
+                cols[i]: value.get("value") for i, value in enumerate(row)
             }
 
-            return {
-                "server message": "Device registered successfully",
-                "data": device_data
-            }
+            return device_response("Device registered successfully", device_data)
         
         except ValueError:
-            print(f"❌ Invalid JSON response: {response.text}")
+            print(f"❌ Invalid database response: {data}")
             raise HTTPException(status_code=500, detail="Invalid database response")
 
-    except requests.exceptions.RequestException as e:
+    except DatabaseError as e:
         print(f"❌ Database request failed: {e}")
-        print(f"Response body: {response.text}")
         raise HTTPException(status_code=500, detail="Database request failed")
 class HW_ID_REQ(BaseModel):
     hw_id: str
@@ -331,6 +474,8 @@ class HW_ID_REQ(BaseModel):
 async def server_lastcon(request: HW_ID_REQ):
     hw_id = request.hw_id
     date = request.date
+    if lastcon_batcher is not None:
+        return device_response("Last server connection updated!", await lastcon_batcher.submit(hw_id, date))
     payload = {
             "requests": [
                 {
@@ -353,10 +498,8 @@ async def server_lastcon(request: HW_ID_REQ):
             ]
         }
     try:
-        response = requests.post(DB_URL, headers=headers, json=payload)
-        response.raise_for_status()
+        data = await db_execute(payload)
         try:
-            data = response.json()
             results = data.get("results", [])
             if not results:
                 print("🚫 No response from DB.")
@@ -371,21 +514,162 @@ async def server_lastcon(request: HW_ID_REQ):
             cols = [col["name"] for col in select_result["cols"]]  # Get column names
             row = select_result["rows"][0]  # Get first row
             device_data = {
-                cols[i]: value["value"] for i, value in enumerate(row)
+                cols[i]: value.get("value") for i, value in enumerate(row)
             }
             
-            return {
-                "server message": "Last server connection updated!",
-                "data": device_data
-            }
+            return device_response("Last server connection updated!", device_data)
                 
         except ValueError:
-            print(f"❌ Invalid JSON response: {response.text}")
+            print(f"❌ Invalid database response: {data}")
             raise HTTPException(status_code=500, detail="Invalid database response")
 
-    except requests.exceptions.RequestException as e:
+    except DatabaseError as e:
         print(f"❌ Database request failed: {e}")
-        print(f"Response body: {response.text}")
         raise HTTPException(status_code=500, detail="Database request failed")
 
-
+async def update_lastcon_rows(updates: dict):
+    """Apply {hw_id: date} last_server_con updates in one pipeline and return {hw_id: device row}."""
+    hw_ids = list(updates)
+    results = await db_pipeline(
+        [_stmt("UPDATE devices SET last_server_con = ? WHERE hardware_id = ?", date, hw_id)
+         for hw_id, date in updates.items()]
+        + [_stmt(f"SELECT * FROM devices WHERE hardware_id IN ({_placeholders(hw_ids)})", *hw_ids)]
+    )
+    return {row['hardware_id']: row for row in _rows(results[-1])}
+
+# Write-behind batching for /lastcon, off unless LASTCON_BATCH_WINDOW_MS > 0
+LASTCON_BATCH_WINDOW_MS = float(os.getenv("LASTCON_BATCH_WINDOW_MS", "0"))
+LASTCON_BATCH_MAX = int(os.getenv("LASTCON_BATCH_MAX", "500"))
+
+class LastconBatcher:
+    """Collect heartbeats for a short window and flush them as one pipeline.
+
+    Updates for the same hardware_id within a window collapse to the latest
+    date; every caller still gets the device row back.
+    """
+
+    def __init__(self, window_ms=LASTCON_BATCH_WINDOW_MS, max_devices=LASTCON_BATCH_MAX):
+        self.window = window_ms / 1000
+        self.max_devices = max_devices
+        self._pending = {}  # hw_id -> date
+        self._waiters = {}  # hw_id -> [Future]
+        self._timer = None
+        self._flushing = set()
+        self.flushes = 0
+        self.updates = 0
+
+    async def submit(self, hw_id: str, date: str):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[hw_id] = date
+        self._waiters.setdefault(hw_id, []).append(future)
+        self.updates += 1
+        if len(self._pending) >= self.max_devices:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, {}
+        task = asyncio.ensure_future(self._flush(pending, waiters))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, pending, waiters):
+        self.flushes += 1
+        try:
+            rows = await update_lastcon_rows(pending)
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for hw_id, futures in waiters.items():
+            row = rows.get(hw_id)
+            for future in futures:
+                if future.done():
+                    continue
+                if row is None:
+                    future.set_exception(HTTPException(status_code=404, detail="Device not found"))
+                else:
+                    future.set_result(row)
+
+    async def close(self):
+        """Flush whatever is still queued and wait for in-flight flushes."""
+        self._flush_now()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self):
+        return {"window_ms": self.window * 1000, "updates": self.updates, "flushes": self.flushes}
+
+lastcon_batcher = LastconBatcher() if LASTCON_BATCH_WINDOW_MS > 0 else None
+
+# ============================== Bulk endpoints for site gateways ==============================
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+async def register_devices(requests: list[DeviceRegisterRequest]):
+    """Bulk register_device: one SELECT/INSERT/SELECT pipeline per chunk, results in input order."""
+    out = []
+    for chunk in _chunks(requests):
+        # devices moving off a legacy id are rebound one by one, as register_device does
+        for r in chunk:
+            if is_legacy_hw_id(r.legacy_hw_id):
+                await rebind_device(r)
+        hw_ids = list(dict.fromkeys(r.hw_id for r in chunk))
+        in_clause = _placeholders(hw_ids)
+        values = [v for r in chunk for v in (r.hw_id, r.date, r.date)]
+        results = await db_pipeline([
+            _stmt(f"SELECT * FROM devices WHERE hardware_id IN ({in_clause})", *hw_ids),
+            _stmt(f"""
+                INSERT OR IGNORE INTO devices (hardware_id, registered_at, last_server_con)
+                VALUES {", ".join("(?, ?, ?)" for _ in chunk)}
+            """, *values),
+            _stmt(f"SELECT * FROM devices WHERE hardware_id IN ({in_clause})", *hw_ids),
+        ])
+        existing = {row['hardware_id']: row for row in _rows(results[0])}
+        devices = {row['hardware_id']: row for row in _rows(results[2])}
+        for r in chunk:
+            if r.hw_id in existing:
+                out.append(device_response("Device already registered", existing[r.hw_id]))
+            else:
+                # later duplicates in the same batch see the device we just created
+                existing[r.hw_id] = devices[r.hw_id]
+                out.append(device_response("Device registered successfully", devices[r.hw_id]))
+    return out
+
+async def server_lastcons(requests: list[HW_ID_REQ]):
+    """Bulk server_lastcon; unknown devices get the same detail a single call's 404 carries."""
+    out = []
+    for chunk in _chunks(requests):
+        rows = await update_lastcon_rows({r.hw_id: r.date for r in chunk})
+        for r in chunk:
+            if r.hw_id in rows:
+                out.append(device_response("Last server connection updated!", rows[r.hw_id]))
+            else:
+                out.append({"detail": "Device not found"})
+    return out
+
+async def check_licenses(keys: list[str]):
+    """Bulk check_license, answering cached keys from memory and the rest with one IN query per chunk."""
+    found = {key for key in keys if license_cache.get(key)}
+    missing = list(dict.fromkeys(key for key in keys if key not in found))
+    for chunk in _chunks(missing):
+        results = await db_pipeline([
+            _stmt(f"SELECT * FROM licenses WHERE license_key IN ({_placeholders(chunk)})", *chunk)
+        ])
+        for row in _rows(results[0]):
+            license_cache.put(row)
+            found.add(row['license_key'])
+    return [{'key': "valid" if key in found else "invalid"} for key in keys]
@@ -1,19 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from db_utils import *
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_db()
+    yield
+    if lastcon_batcher is not None:
+        await lastcon_batcher.close()
+    await close_db()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/validate")
-def validate_key_endpoint(request: ValidationRequest):
+async def validate_key_endpoint(request: ValidationRequest):
     try:
-        check = check_license(request.key)
-        if check['key'] == 'valid':
-            result = validate_key(request.key, request.hw_id, request.date)
-            print('validated')
-            if result['status'] == 'licensed':
-                print('finding key')
-                return find_key_id(request.key, request.hw_id)
-            return {"status": "invalid"}
-        return {"status": "invalid"}
+        return await validate_license(request.key, request.hw_id, request.date)
     except HTTPException as e:
         print(f"endpoint error: {e.detail}")  # Minimal error log
         raise
@@ -35,4 +37,23 @@ class LicenseRequest(BaseModel):
 
 @app.post("/license")
 async def check_license_endpoint(request: LicenseRequest):
-    return check_license(request.key)
\ No newline at end of file
+    return await check_license(request.key)
+
+@app.post("/reg_dev/bulk")
+async def reg_dev_bulk_endpoint(requests: list[DeviceRegisterRequest]):
+    return await register_devices(requests)
+
+@app.post("/lastcon/bulk")
+async def update_lastcon_bulk_endpoint(requests: list[HW_ID_REQ]):
+    return await server_lastcons(requests)
+
+@app.post("/license/bulk")
+async def check_license_bulk_endpoint(requests: list[LicenseRequest]):
+    return await check_licenses([r.key for r in requests])
+
+@app.get("/stats")
+async def stats_endpoint():
+    stats = {"license_cache": license_cache.stats(), "single_flight": single_flight.stats()}
+    if lastcon_batcher is not None:
+        stats["lastcon_batcher"] = lastcon_batcher.stats()
+    return stats